@@ -4,8 +4,10 @@ Demo Mode - Test FunctionGemma without SITL
 Simulates drone responses for testing the AI interface
 """
 
+import math
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,11 +15,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
+from rich.table import Table
 from src.drone_functions import DRONE_FUNCTIONS
 from src.function_gemma import FunctionGemmaInterface
 
 console = Console()
 
+# (name, description) rows for /help; DRONE_FUNCTIONS is static
+_HELP_ROWS = [(name, func_def['description']) for name, func_def in DRONE_FUNCTIONS.items()]
+
 
 class MockDroneController:
     """Mock drone controller for demo mode"""
@@ -40,6 +46,7 @@ class MockDroneController:
         if not self.armed:
             return {"status": "error", "message": "Drone must be armed first"}
         self.altitude = altitude
+        self.position["alt"] = altitude
         self.mode = "GUIDED"
         return {
             "status": "success",
@@ -49,6 +56,7 @@ class MockDroneController:
     
     def land(self):
         self.altitude = 0
+        self.position["alt"] = 0
         self.mode = "LAND"
         return {"status": "success", "message": "Landing (simulated)"}
     
@@ -71,6 +79,37 @@ class MockDroneController:
             "altitude": alt
         }
     
+    def increase_altitude(self, meters):
+        if not self.armed:
+            return {"status": "error", "message": "Vehicle must be armed"}
+        self.altitude += meters
+        self.position["alt"] = self.altitude
+        return {
+            "status": "success",
+            "message": f"Climbing {meters}m to {self.altitude}m (simulated)"
+        }
+    
+    def _move(self, north, east, meters, direction):
+        if not self.armed:
+            return {"status": "error", "message": "Vehicle must be armed for movement"}
+        # ~111km per degree of latitude; longitude degrees shrink with cos(lat)
+        self.position["lat"] += north / 111320
+        self.position["lon"] += east / (111320 * math.cos(math.radians(self.position["lat"])))
+        self.mode = "GUIDED"
+        return {"status": "success", "message": f"Moving {meters}m {direction} (simulated)"}
+    
+    def move_north(self, meters):
+        return self._move(meters, 0, meters, "north")
+    
+    def move_south(self, meters):
+        return self._move(-meters, 0, meters, "south")
+    
+    def move_east(self, meters):
+        return self._move(0, meters, meters, "east")
+    
+    def move_west(self, meters):
+        return self._move(0, -meters, meters, "west")
+    
     def set_speed(self, speed, speed_type="ground"):
         return {
             "status": "success",
@@ -100,15 +139,29 @@ class DemoMode:
     
     def __init__(self):
         self.drone = MockDroneController()
+        # Only functions declared to the model can be called
+        self._dispatch = {
+            name: getattr(self.drone, name)
+            for name in DRONE_FUNCTIONS
+            if hasattr(self.drone, name)
+        }
         self.gemma = FunctionGemmaInterface()
         self.running = False
+        # Queries run on a single worker thread, in the order they were typed,
+        # so the prompt accepts the next command while the model is busy
+        self.worker = ThreadPoolExecutor(max_workers=1)
         
     def execute_function(self, function_name: str, arguments: dict):
         """Execute a mock function"""
         console.print(f"\n[bold yellow]⚙️  Executing (DEMO): {function_name}({arguments})[/bold yellow]")
         
+        func = self._dispatch.get(function_name)
+        if func is None:
+            error_result = {"status": "error", "message": f"Unknown function: {function_name}"}
+            console.print(f"[bold red]❌ {error_result['message']}[/bold red]")
+            return error_result
+        
         try:
-            func = getattr(self.drone, function_name)
             if arguments:
                 result = func(**arguments)
             else:
@@ -126,21 +179,54 @@ class DemoMode:
             console.print(f"[bold red]❌ {error_result['message']}[/bold red]")
             return error_result
     
+    def submit(self, job, *args):
+        """Queue a job on the worker, reporting any exception it raises"""
+        self.worker.submit(job, *args).add_done_callback(self._report_failure)
+    
+    @staticmethod
+    def _report_failure(future):
+        """Done-callback: print the exception a queued job died with"""
+        if not future.cancelled() and future.exception() is not None:
+            console.print(f"\n[bold red]❌ Error:[/bold red] {future.exception()}")
+    
+    def reset(self):
+        """Clear the conversation (runs on the worker, after pending queries)"""
+        self.gemma.reset_conversation()
+        console.print("[green]🔄 Conversation reset[/green]")
+    
     def process_query(self, user_input: str):
-        """Process query with FunctionGemma"""
-        response = self.gemma.query(user_input)
+        """Process query with FunctionGemma ('cmd1; cmd2' runs commands in order)"""
+        commands = [c.strip() for c in user_input.split(';') if c.strip()]
+        
+        if len(commands) > 1:
+            responses = self.gemma.query_batch(commands)
+        else:
+            responses = [self.gemma.query(user_input)]
         
+        for response in responses:
+            if not self.handle_response(response):
+                if len(responses) > 1:
+                    console.print("[yellow]Skipping remaining commands[/yellow]")
+                break
+    
+    def handle_response(self, response: dict) -> bool:
+        """Execute the calls in a response, returning True if all succeeded"""
         if response['type'] == 'function_calls':
             for call in response['calls']:
                 result = self.execute_function(call['name'], call['arguments'])
                 final_response = self.gemma.add_tool_result(call['name'], result)
                 console.print(f"\n[bold blue]🤖 Assistant:[/bold blue] {final_response}")
+                if result.get("status") != "success":
+                    return False
+            return True
                 
         elif response['type'] == 'text':
             console.print(f"\n[bold blue]🤖 Assistant:[/bold blue] {response['content']}")
             
         elif response['type'] == 'error':
             console.print(f"\n[bold red]❌ Error:[/bold red] {response['message']}")
+        
+        return False
     
     def show_welcome(self):
         """Show demo welcome"""
@@ -165,6 +251,7 @@ class DemoMode:
   • "where am I?"
   • "fly to latitude 28.5, longitude 77.0"
   • "return to launch"
+  • "arm the drone; takeoff to 10 meters"  (';' runs several in order)
 
 [dim]Special commands:[/dim]
   [bold]/help[/bold] or [bold]/h[/bold]  - Show functions
@@ -177,6 +264,10 @@ class DemoMode:
         """Run demo mode"""
         self.show_welcome()
         
+        # Load the model now so the first command doesn't pay for it
+        console.print("[dim]Loading model...[/dim]")
+        self.gemma.warmup()
+        
         console.print("\n[bold green]✅ Demo mode ready! Type your command.[/bold green]\n")
         
         self.running = True
@@ -192,31 +283,32 @@ class DemoMode:
                     
                     # Quit commands
                     if cmd in ['/quit', '/exit', '/q']:
+                        # Let queued commands finish first
+                        self.worker.shutdown(wait=True)
                         console.print("\n[bold yellow]👋 Goodbye![/bold yellow]")
                         break
                     
-                    # Reset commands
+                    # Reset commands (queued behind pending queries)
                     elif cmd in ['/reset', '/r']:
-                        self.gemma.reset_conversation()
-                        console.print("[green]🔄 Conversation reset[/green]")
+                        self.submit(self.reset)
                     
                     # Help commands
                     elif cmd in ['/help', '/h']:
-                        from rich.table import Table
                         table = Table(title="Available Functions", border_style="cyan")
                         table.add_column("Function", style="yellow")
                         table.add_column("Description")
-                        for fname, fdef in DRONE_FUNCTIONS.items():
-                            table.add_row(fname, fdef['description'])
+                        for row in _HELP_ROWS:
+                            table.add_row(*row)
                         console.print(table)
                     
                     else:
                         console.print(f"[red]❌ Unknown command: {cmd}[/red]")
                         console.print("[dim]Type /help or /h for available commands[/dim]")
                 else:
-                    self.process_query(user_input)
+                    self.submit(self.process_query, user_input)
                     
             except KeyboardInterrupt:
+                self.worker.shutdown(wait=False, cancel_futures=True)
                 console.print("\n\n[bold yellow]👋 Interrupted![/bold yellow]")
                 break
 
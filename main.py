@@ -4,31 +4,52 @@ ArduPilot Offline Chat Tool - Main Interface
 Connects FunctionGemma with PyMAVLink drone control
 """
 
+import logging
 import sys
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.table import Table
 from src.drone_functions import DroneController, DRONE_FUNCTIONS
-from src.function_gemma import FunctionGemmaInterface
+from src.function_gemma import FunctionGemmaInterface, DEFAULT_MODEL, CACHE_DB
 
 console = Console()
 
+# (name, description, parameters) rows for /help; DRONE_FUNCTIONS is static
+_HELP_ROWS = [
+    (name, func_def['description'],
+     ", ".join(f"{k}: {v['type']}" for k, v in func_def['parameters'].items()) or "None")
+    for name, func_def in DRONE_FUNCTIONS.items()
+]
+
 
 class ArduPilotChatTool:
     """Main chat interface for ArduPilot drone control"""
     
-    def __init__(self, connection_string: str = 'udp:127.0.0.1:14550'):
+    def __init__(self, connection_string: str = 'udp:127.0.0.1:14550', cache_db: str = None):
         """
         Initialize chat tool
         
         Args:
             connection_string: MAVLink connection string
+            cache_db: SQLite file to keep parsed commands across runs (None = memory only)
         """
         self.drone = DroneController(connection_string)
-        self.gemma = FunctionGemmaInterface()
+        self.gemma = FunctionGemmaInterface(cache_db=cache_db)
         self.running = False
         
+        # Slash command -> handler
+        self._commands = {
+            cmd: handler
+            for cmds, handler in [
+                (('/quit', '/exit', '/q'), self.quit),
+                (('/help', '/h'), self.show_help),
+                (('/status', '/s'), self.show_status),
+                (('/reset', '/r'), self.reset),
+            ]
+            for cmd in cmds
+        }
+        
     def connect_drone(self) -> bool:
         """Connect to drone/SITL"""
         console.print("\n[bold cyan]🔌 Connecting to drone...[/bold cyan]")
@@ -74,12 +95,37 @@ class ArduPilotChatTool:
         """
         Process user query through FunctionGemma and execute functions
         
+        Several commands separated by ';' are sent to the model together
+        and executed in order, stopping at the first one that fails.
+        
         Args:
             user_input: User's natural language command
         """
-        # Query FunctionGemma
-        response = self.gemma.query(user_input)
+        commands = [c.strip() for c in user_input.split(';') if c.strip()]
+        
+        # Query FunctionGemma, with a spinner so the wait is visible
+        with console.status("[dim]Thinking...[/dim]"):
+            if len(commands) > 1:
+                responses = self.gemma.query_batch(commands)
+            else:
+                responses = [self.gemma.query(user_input)]
         
+        for response in responses:
+            if not self.handle_response(response):
+                if len(responses) > 1:
+                    console.print("[yellow]Skipping remaining commands[/yellow]")
+                break
+    
+    def handle_response(self, response: dict) -> bool:
+        """
+        Execute the function calls in a FunctionGemma response
+        
+        Args:
+            response: Response from FunctionGemmaInterface.query()
+            
+        Returns:
+            True if every function call succeeded
+        """
         if response['type'] == 'function_calls':
             # Execute each function call
             for call in response['calls']:
@@ -93,12 +139,18 @@ class ArduPilotChatTool:
                 final_response = self.gemma.add_tool_result(func_name, result)
                 console.print(f"\n[bold blue]Assistant:[/bold blue] {final_response}")
                 
+                if result.get("status") != "success":
+                    return False
+            return True
+                
         elif response['type'] == 'text':
             # Just a text response
             console.print(f"\n[bold blue]Assistant:[/bold blue] {response['content']}")
             
         elif response['type'] == 'error':
             console.print(f"\n[bold red][ERROR][/bold red] {response['message']}")
+        
+        return False
     
     def show_welcome(self):
         """Show welcome banner"""
@@ -136,11 +188,8 @@ class ArduPilotChatTool:
         table.add_column("Description", style="white")
         table.add_column("Parameters", style="dim")
         
-        for func_name, func_def in DRONE_FUNCTIONS.items():
-            params = ", ".join([f"{k}: {v['type']}" for k, v in func_def['parameters'].items()])
-            if not params:
-                params = "None"
-            table.add_row(func_name, func_def['description'], params)
+        for row in _HELP_ROWS:
+            table.add_row(*row)
         
         console.print(table)
     
@@ -158,6 +207,16 @@ class ArduPilotChatTool:
         if batt.get("status") == "success":
             console.print(f"[green]Battery:[/green] {batt['voltage']:.2f}V, {batt['current']:.2f}A, {batt['remaining']}%")
     
+    def quit(self):
+        """Stop the chat loop"""
+        console.print("\n[bold yellow]👋 Goodbye![/bold yellow]")
+        self.running = False
+    
+    def reset(self):
+        """Clear conversation history"""
+        self.gemma.reset_conversation()
+        console.print("[green]Conversation reset[/green]")
+    
     def run(self):
         """Main chat loop"""
         self.show_welcome()
@@ -167,6 +226,10 @@ class ArduPilotChatTool:
             console.print("[bold red][ERROR] Failed to connect to drone. Exiting.[/bold red]")
             return
         
+        # Load the model now so the first command doesn't pay for it
+        console.print("[dim]Loading model...[/dim]")
+        self.gemma.warmup()
+        
         console.print("\n[bold green]Ready! Type your command or /help for assistance.[/bold green]\n")
         
         self.running = True
@@ -180,27 +243,9 @@ class ArduPilotChatTool:
                 
                 # Handle commands
                 if user_input.startswith('/'):
-                    cmd = user_input.lower()
-                    
-                    # Quit commands
-                    if cmd in ['/quit', '/exit', '/q']:
-                        console.print("\n[bold yellow]👋 Goodbye![/bold yellow]")
-                        self.running = False
-                        break
-                    
-                    # Help commands
-                    elif cmd in ['/help', '/h']:
-                        self.show_help()
-                    
-                    # Status commands
-                    elif cmd in ['/status', '/s']:
-                        self.show_status()
-                    
-                    # Reset commands
-                    elif cmd in ['/reset', '/r']:
-                        self.gemma.reset_conversation()
-                        console.print("[green]Conversation reset[/green]")
-                    
+                    handler = self._commands.get(user_input.lower())
+                    if handler:
+                        handler()
                     else:
                         console.print(f"[red][ERROR] Unknown command: {user_input}[/red]")
                         console.print("[dim]Type /help or /h for available commands[/dim]")
@@ -214,6 +259,8 @@ class ArduPilotChatTool:
                 break
             except Exception as e:
                 console.print(f"\n[bold red][ERROR][/bold red] {str(e)}")
+        
+        self.drone.disconnect()
 
 
 def main():
@@ -228,6 +275,7 @@ Examples:
   %(prog)s                                    # Connect to default SITL
   %(prog)s -c tcp:127.0.0.1:5760             # Connect to specific port
   %(prog)s -m ardupilot-stage1 -v            # Use specific model with verbose output
+  %(prog)s --cache-db                         # Reuse parsed commands from earlier runs
         """
     )
     
@@ -239,8 +287,16 @@ Examples:
     
     parser.add_argument(
         '--model', '-m',
-        default='ardupilot-stage1',
-        help='Ollama model name (default: ardupilot-stage1)'
+        default=DEFAULT_MODEL,
+        help=f'Ollama model name (default: {DEFAULT_MODEL}, override with $MODEL_NAME)'
+    )
+    
+    parser.add_argument(
+        '--cache-db',
+        nargs='?',
+        const=CACHE_DB,
+        metavar='PATH',
+        help=f'Keep parsed commands across runs in a SQLite file (default path: {CACHE_DB})'
     )
     
     parser.add_argument(
@@ -251,12 +307,19 @@ Examples:
     
     args = parser.parse_args()
     
-    # Set verbose mode (could be used for debug prints)
+    # Verbose mode shows how each command was resolved (preprocessing,
+    # fast path, cache, model output)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format='%(message)s'
+    )
+    for noisy in ('httpx', 'httpcore'):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
     if args.verbose:
         console.print("[dim]Verbose mode enabled[/dim]")
     
     # Create and run chat tool
-    chat_tool = ArduPilotChatTool(connection_string=args.connection)
+    chat_tool = ArduPilotChatTool(connection_string=args.connection, cache_db=args.cache_db)
     chat_tool.gemma.model_name = args.model
     chat_tool.run()
 
@@ -3,8 +3,28 @@ ArduPilot AI Assistant - Source Package
 Natural language drone control with FunctionGemma
 """
 
-from .drone_functions import DroneController, DRONE_FUNCTIONS
-from .function_gemma import FunctionGemmaInterface
+import importlib
 
 __version__ = "1.0.0"
 __all__ = ["DroneController", "DRONE_FUNCTIONS", "FunctionGemmaInterface"]
+
+# Public name -> submodule. Submodules are imported on first access so that
+# importing one of them (e.g. src.drone_functions) doesn't also load the
+# other's dependencies (pymavlink / ollama).
+_EXPORTS = {
+    "DroneController": ".drone_functions",
+    "DRONE_FUNCTIONS": ".drone_functions",
+    "FunctionGemmaInterface": ".function_gemma",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
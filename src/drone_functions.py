@@ -3,25 +3,195 @@ ArduPilot Drone Control Functions Library
 Provides function definitions for FunctionGemma to call via PyMAVLink
 """
 
+import os
 from pymavlink import mavutil
 from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from types import MappingProxyType
+import functools
+import queue
+import threading
 import time
 
+# Messages the background listener queues in arrival order; every other
+# message type is kept as latest-value telemetry
+QUEUED_MESSAGES = ('COMMAND_ACK', 'MISSION_ACK', 'MISSION_REQUEST')
+QUEUE_SIZE = 32
+
+# The listener waits RX_ERROR_BACKOFF seconds after a failed read, and gives
+# up after RX_MAX_ERRORS failures in a row (link gone for good)
+RX_ERROR_BACKOFF = 0.5
+RX_MAX_ERRORS = 10
+
+# Mission item requests. Autopilots answer MISSION_ITEM_INT uploads with
+# either message; both carry the requested seq and share the MISSION_REQUEST
+# queue
+MISSION_REQUEST_TYPES = ('MISSION_REQUEST', 'MISSION_REQUEST_INT')
+
+# Cached telemetry older than this (seconds) is treated as missing. Matches
+# the usual 2-2.5s MAVLink heartbeat timeout, so a dead link isn't reported
+# as live state.
+MAX_MSG_AGE = 2.0
+
+# Seconds to wait for a COMMAND_ACK. UDP (SITL, local GCS forwarding) answers
+# well within CMD_TIMEOUT; TCP bridges and serial telemetry radios can take
+# much longer, and a too-short wait reports accepted commands as rejected.
+CMD_TIMEOUT = 3.0
+SLOW_LINK_CMD_TIMEOUT = 10.0
+
+# HEARTBEAT base_mode bit set while the motors are armed. Checked for every
+# message while waiting on an arm/disarm, so bind it once here
+ARMED_FLAG = mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+
+# COMMAND_ACK result codes (MAV_RESULT), indexed by value
+MAV_RESULT_NAMES = (
+    "Accepted",
+    "Temporarily rejected",
+    "Denied",
+    "Unsupported",
+    "Failed",
+    "In progress",
+    "Cancelled",
+)
+
+# Telemetry streams requested once on connect (stream id -> rate in Hz).
+# POSITION carries GLOBAL_POSITION_INT; EXTENDED_STATUS carries SYS_STATUS
+# and GPS_RAW_INT.
+STREAM_RATES = {
+    mavutil.mavlink.MAV_DATA_STREAM_POSITION: 5,
+    mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS: 2,
+}
+
+# Argument limits (meters) for the flight commands the model can call
+MIN_TAKEOFF_ALT = 2.0
+MAX_TAKEOFF_ALT = 120.0
+MAX_ALT_CHANGE = 100.0
+MAX_MOVE_DISTANCE = 1000.0
+MIN_WAYPOINT_ALT = 1.0
+MAX_WAYPOINT_ALT = 500.0
+
+# (negative, positive) direction names for each NED axis in move_relative
+AXIS_LABELS = (('south', 'north'), ('west', 'east'), ('up', 'down'))
+
+# Frames and commands shared by takeoff, guided targets, mode changes and
+# missions, bound once instead of looked up through mavutil.mavlink on every
+# use
+FRAME_GLOBAL_REL_ALT = mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT
+FRAME_LOCAL_NED = mavutil.mavlink.MAV_FRAME_LOCAL_NED
+CMD_TAKEOFF = mavutil.mavlink.MAV_CMD_NAV_TAKEOFF
+CMD_WAYPOINT = mavutil.mavlink.MAV_CMD_NAV_WAYPOINT
+CMD_LAND = mavutil.mavlink.MAV_CMD_NAV_LAND
+CMD_SET_MODE = mavutil.mavlink.MAV_CMD_DO_SET_MODE
+CMD_ARM_DISARM = mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM
+
+# Commands that change what HEARTBEAT reports (mode, armed flag)
+STATE_COMMANDS = (CMD_SET_MODE, CMD_ARM_DISARM)
+
+# MISSION_ITEM_INT x/y units: degrees * 1e7 in global frames, meters * 1e4
+# in local ones
+GLOBAL_XY_SCALE = 1e7
+LOCAL_XY_SCALE = 1e4
+
+
+@dataclass
+class MissionItem:
+    """
+    One mission waypoint, in MISSION_ITEM_INT field order and units
+    (x/y scaled by GLOBAL_XY_SCALE or LOCAL_XY_SCALE, ready to send)
+    """
+    __slots__ = ('seq', 'frame', 'command',
+                 'param1', 'param2', 'param3', 'param4', 'x', 'y', 'z')
+    seq: int
+    frame: int
+    command: int
+    param1: float
+    param2: float
+    param3: float
+    param4: float
+    x: int
+    y: int
+    z: float
+
+
+def _result_name(result: int) -> str:
+    """Readable name for a COMMAND_ACK result code"""
+    if 0 <= result < len(MAV_RESULT_NAMES):
+        return MAV_RESULT_NAMES[result]
+    return f"Unknown ({result})"
+
+
+def _summary_goto(wp: MissionItem) -> str:
+    """Mission summary text for a NAV_WAYPOINT item"""
+    if wp.frame == FRAME_LOCAL_NED:
+        return f"Go to ({wp.x / LOCAL_XY_SCALE}m N, {wp.y / LOCAL_XY_SCALE}m E, {-wp.z}m alt)"
+    return f"Go to ({wp.x / GLOBAL_XY_SCALE}, {wp.y / GLOBAL_XY_SCALE}, {wp.z}m)"
+
+
+# get_mission_summary text for each mission command
+SUMMARY_FORMATS = {
+    CMD_TAKEOFF: lambda wp: f"Takeoff to {wp.z}m",
+    CMD_WAYPOINT: _summary_goto,
+    CMD_LAND: lambda wp: "Land",
+}
+
+
+def _mav_errors(prefix: str):
+    """
+    Decorator for DroneController commands: an unexpected exception becomes
+    {"status": "error", "message": "<prefix>: <error>"}, like the command's
+    own failure results
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                return {"status": "error", "message": f"{prefix}: {str(e)}"}
+        return wrapper
+    return decorator
+
+
 class DroneController:
     """PyMAVLink-based drone controller for ArduCopter"""
     
-    def __init__(self, connection_string: str = 'udp:127.0.0.1:14550'):
+    __slots__ = (
+        'master', 'connection_string', 'cmd_timeout',
+        'mission_items', 'mission_mode',
+        '_rx_thread', '_rx_stop', '_rx_cond', '_latest', '_queues', '_state_sent_at',
+        '_mode_map', '_mode_map_inv',
+    )
+    
+    def __init__(self, connection_string: str = 'udp:127.0.0.1:14550',
+                 cmd_timeout: Optional[float] = None):
         """
         Initialize connection to drone/SITL
         
         Args:
             connection_string: MAVLink connection string (default: SITL UDP)
+            cmd_timeout: Seconds to wait for command ACKs (default: based on
+                the link type, see CMD_TIMEOUT)
         """
         self.master = None
         self.connection_string = connection_string
+        if cmd_timeout is None:
+            cmd_timeout = CMD_TIMEOUT if connection_string.startswith('udp') else SLOW_LINK_CMD_TIMEOUT
+        self.cmd_timeout = cmd_timeout
         self.mission_items = []  # Store mission waypoints
         self.mission_mode = False  # Track if building mission
         
+        # Background MAVLink listener state
+        self._rx_thread = None
+        self._rx_stop = threading.Event()
+        self._rx_cond = threading.Condition()
+        self._latest = {}  # msg type -> (time.monotonic(), latest message)
+        self._queues = {t: queue.Queue(maxsize=QUEUE_SIZE) for t in QUEUED_MESSAGES}
+        self._state_sent_at = 0.0  # time.monotonic() of the last mode/arm command
+        
+        # Mode name <-> id tables; static per vehicle, filled on connect
+        self._mode_map = None
+        self._mode_map_inv = None
+        
     def connect(self) -> bool:
         """
         Connect to the drone
@@ -30,36 +200,339 @@ class DroneController:
             True if connected successfully, False otherwise
         """
         try:
-            self.master = mavutil.mavlink_connection(self.connection_string)
+            # Speak MAVLink 2 from the first packet instead of only after the
+            # vehicle's first MAVLink 2 message: it drops trailing zero bytes
+            # from every payload (MISSION_ITEM_INT included). pymavlink picks
+            # the wire protocol when a dialect is loaded, so reload the current
+            # one here rather than relying on the environment at import time.
+            # Like pymavlink's own switch on the first MAVLink 2 packet, this
+            # applies to the whole process
+            os.environ['MAVLINK20'] = '1'
+            self.master = mavutil.mavlink_connection(
+                self.connection_string, dialect=mavutil.current_dialect)
             # Wait for heartbeat
             self.master.wait_heartbeat()
+            self._load_mode_maps()
             print(f"✅ Connected to drone (sysid={self.master.target_system}, compid={self.master.target_component})")
+            
+            # Read MAVLink in the background so commands don't poll the socket
+            self._rx_stop.clear()
+            self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+            self._rx_thread.start()
+            
+            # Ask for telemetry once; the listener keeps the latest values
+            for stream_id, rate in STREAM_RATES.items():
+                self.master.mav.request_data_stream_send(
+                    self.master.target_system,
+                    self.master.target_component,
+                    stream_id,
+                    rate,  # rate Hz
+                    1      # start
+                )
             return True
         except Exception as e:
             print(f"❌ Connection failed: {e}")
             return False
     
+    def disconnect(self):
+        """Stop the background listener and close the connection"""
+        self._rx_stop.set()
+        thread = self._rx_thread
+        if thread is not None:
+            thread.join(timeout=1.0)
+            self._rx_thread = None
+        if self.master is not None:
+            self.master.close()
+            self.master = None
+    
+    def _load_mode_maps(self):
+        """Build the mode name <-> id tables for the connected vehicle"""
+        mode_map = self.master.mode_mapping()
+        if not mode_map:
+            # Vehicle type not known yet; try again on next use
+            return
+        self._mode_map = mode_map
+        self._mode_map_inv = {v: k for k, v in mode_map.items()}
+    
+    def _mode_name(self, mode_id: int) -> Optional[str]:
+        """Flight mode name for a HEARTBEAT custom_mode, or None if the table isn't known"""
+        if self._mode_map_inv is None:
+            self._load_mode_maps()
+        if self._mode_map_inv is None:
+            return None
+        return self._mode_map_inv.get(mode_id, "UNKNOWN")
+    
+    def _rx_loop(self):
+        """Background listener: store telemetry and queue ACKs/mission requests"""
+        errors = 0
+        while not self._rx_stop.is_set():
+            try:
+                msg = self.master.recv_match(blocking=True, timeout=0.1)
+            except Exception as e:
+                errors += 1
+                if errors >= RX_MAX_ERRORS:
+                    print(f"❌ MAVLink listener stopped after {errors} read errors: {e}")
+                    # Commands read the connection directly from now on,
+                    # so they report the failure instead of timing out
+                    self._rx_thread = None
+                    return
+                self._rx_stop.wait(RX_ERROR_BACKOFF)
+                continue
+            errors = 0
+            if msg is None:
+                continue
+            
+            msg_type = msg.get_type()
+            if msg_type in MISSION_REQUEST_TYPES:
+                msg_type = 'MISSION_REQUEST'
+            if msg_type in self._queues:
+                q = self._queues[msg_type]
+                # Drop the oldest entry if nobody is consuming this queue
+                if q.full():
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+                q.put_nowait(msg)
+            else:
+                with self._rx_cond:
+                    self._latest[msg_type] = (time.monotonic(), msg)
+                    self._rx_cond.notify_all()
+    
+    def _recv(self, msg_type: str, timeout: float):
+        """
+        Receive a message of the given type
+        
+        With the background listener running, ACKs and mission requests are
+        taken from their queue and telemetry returns the latest cached
+        message (waiting only if there is none younger than MAX_MSG_AGE).
+        Without it, falls back to reading the connection directly.
+        
+        Args:
+            msg_type: MAVLink message type name
+            timeout: Seconds to wait
+        
+        Returns:
+            The message, or None on timeout
+        """
+        if self._rx_thread is None:
+            types = list(MISSION_REQUEST_TYPES) if msg_type == 'MISSION_REQUEST' else msg_type
+            return self.master.recv_match(type=types, blocking=True, timeout=timeout)
+        
+        if msg_type in self._queues:
+            try:
+                return self._queues[msg_type].get(timeout=timeout)
+            except queue.Empty:
+                return None
+        
+        with self._rx_cond:
+            self._rx_cond.wait_for(lambda: self._fresh(msg_type) is not None, timeout)
+            return self._fresh(msg_type)
+    
+    def _heartbeat(self, timeout: float):
+        """
+        Receive a HEARTBEAT that reflects the last mode/arm command
+        
+        With the background listener, a cached heartbeat received before
+        the last mode or arm/disarm command (or its ACK) may still show the
+        old state, so this waits for a newer one. Without it, reads the next heartbeat
+        off the connection.
+        
+        Args:
+            timeout: Seconds to wait
+        
+        Returns:
+            The HEARTBEAT message, or None on timeout
+        """
+        if self._rx_thread is None:
+            return self._recv('HEARTBEAT', timeout)
+        
+        with self._rx_cond:
+            self._rx_cond.wait_for(lambda: self._current_heartbeat() is not None, timeout)
+            return self._current_heartbeat()
+    
+    def _current_heartbeat(self):
+        """
+        Cached HEARTBEAT if younger than MAX_MSG_AGE and received after the
+        last mode/arm command (caller holds _rx_cond)
+        """
+        entry = self._latest.get('HEARTBEAT')
+        if (entry is None or entry[0] < self._state_sent_at
+                or time.monotonic() - entry[0] >= MAX_MSG_AGE):
+            return None
+        return entry[1]
+    
+    def _fresh(self, msg_type: str):
+        """Cached message of the given type if younger than MAX_MSG_AGE (caller holds _rx_cond)"""
+        entry = self._latest.get(msg_type)
+        if entry and time.monotonic() - entry[0] < MAX_MSG_AGE:
+            return entry[1]
+        return None
+    
+    def _wait_ack(self, command: int, timeout: Optional[float] = None):
+        """
+        Wait for the COMMAND_ACK of a specific command
+        
+        ACKs for other commands (e.g. late replies to earlier requests) are
+        discarded.
+        
+        Args:
+            command: MAV_CMD id the ACK must match
+            timeout: Seconds to wait (default: self.cmd_timeout)
+        
+        Returns:
+            The COMMAND_ACK message, or None on timeout
+        """
+        return self._wait_acks([command], timeout).get(command)
+    
+    def _wait_acks(self, commands, timeout: Optional[float] = None) -> Dict[int, Any]:
+        """
+        Wait for the COMMAND_ACKs of several commands sent back-to-back
+        
+        Args:
+            commands: MAV_CMD ids to collect ACKs for
+            timeout: Seconds to wait for all of them (default: self.cmd_timeout)
+        
+        Returns:
+            Dictionary of command id -> COMMAND_ACK (missing on timeout)
+        """
+        if timeout is None:
+            timeout = self.cmd_timeout
+        acks = {}
+        deadline = time.monotonic() + timeout
+        while len(acks) < len(commands):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ack = self._recv('COMMAND_ACK', remaining)
+            if ack is None:
+                break
+            if ack.command in commands:
+                acks[ack.command] = ack
+                if ack.command in STATE_COMMANDS:
+                    # The vehicle switches before it ACKs, so only
+                    # heartbeats from here on are sure to show the new state
+                    self._state_sent_at = time.monotonic()
+        return acks
+    
+    def _newest(self, msg_type: str, msg):
+        """
+        Skip ahead to the most recent message of the given type that has
+        already arrived
+        
+        Args:
+            msg_type: MAVLink message type name (a queued type)
+            msg: The message just received
+        
+        Returns:
+            The newest pending message, or msg if nothing newer is waiting
+        """
+        if self._rx_thread is None:
+            types = list(MISSION_REQUEST_TYPES) if msg_type == 'MISSION_REQUEST' else msg_type
+            while True:
+                newer = self.master.recv_match(type=types, blocking=False)
+                if newer is None:
+                    return msg
+                msg = newer
+        
+        q = self._queues[msg_type]
+        while True:
+            try:
+                msg = q.get_nowait()
+            except queue.Empty:
+                return msg
+    
+    def _drain(self, msg_type: str):
+        """Discard queued messages of the given type left over from earlier requests"""
+        q = self._queues[msg_type]
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+    
     def _check_armed_state(self) -> bool:
         """
         Helper method to reliably check if the drone is armed.
 
-        This method receives a HEARTBEAT message and checks the armed flag
-        in base_mode. This is more reliable than motors_armed() in SITL
-        because it ensures we have fresh state from the vehicle.
+        Checks the armed flag in base_mode of a HEARTBEAT that reflects the
+        last mode/arm command (see _heartbeat): the cached one if it is
+        recent and newer than that command, otherwise the next to arrive.
+        This is more reliable than motors_armed() in SITL, which tracks
+        whatever heartbeat pymavlink saw last.
 
         Returns:
-            True if armed, False otherwise
+            True if armed, False otherwise (including no heartbeat or a
+            link error)
         """
         try:
-            # Receive a fresh HEARTBEAT to get current state
-            msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=1)
-            if msg:
-                # Check the armed flag in base_mode
-                return bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)
-            return False
-        except:
+            msg = self._heartbeat(MAX_MSG_AGE)
+        except (OSError, mavutil.mavlink.MAVError):
             return False
+        # Check the armed flag in base_mode
+        return msg is not None and bool(msg.base_mode & ARMED_FLAG)
 
+    def _preflight(self) -> Dict[str, Any]:
+        """
+        Read armed state, flight mode and position in one pass
+        
+        Armed state and mode come from the same HEARTBEAT (one that reflects
+        the last mode command, see _heartbeat) and the position
+        from GLOBAL_POSITION_INT (both cached by the background listener),
+        instead of each check waiting for its own message. The position is
+        only fetched when the vehicle is armed, since every caller stops
+        there otherwise.
+        
+        Returns:
+            Dictionary with armed, mode, altitude, lat and lon (None when
+            unavailable)
+        """
+        state = {"armed": False, "mode": None, "altitude": None, "lat": None, "lon": None}
+        
+        msg = self._heartbeat(MAX_MSG_AGE)
+        if msg:
+            state["armed"] = bool(msg.base_mode & ARMED_FLAG)
+            state["mode"] = self._mode_name(msg.custom_mode)
+        
+        if state["armed"]:
+            pos = self.get_position()
+            if pos.get("status") == "success":
+                state["altitude"] = pos["altitude"]
+                state["lat"] = pos["latitude"]
+                state["lon"] = pos["longitude"]
+        
+        return state
+    
+    def _wait_armed(self, armed: bool, timeout: float) -> bool:
+        """
+        Wait until HEARTBEAT reports the given armed state
+        
+        With the background listener this sleeps on its condition and wakes
+        as soon as a matching heartbeat arrives; otherwise it polls the
+        connection.
+        
+        Args:
+            armed: Armed state to wait for
+            timeout: Seconds to wait
+        
+        Returns:
+            True if the state was reached, False on timeout
+        """
+        def matches(msg):
+            return msg is not None and bool(msg.base_mode & ARMED_FLAG) == armed
+        
+        if self._rx_thread is not None:
+            with self._rx_cond:
+                return self._rx_cond.wait_for(lambda: matches(self._current_heartbeat()), timeout)
+        
+        # recv_match already blocks until a heartbeat arrives, so no sleep
+        start = time.monotonic()
+        while time.monotonic() - start < timeout:
+            if matches(self._recv('HEARTBEAT', 0.5)):
+                return True
+        return False
+    
+    @_mav_errors("Failed to arm")
     def arm(self) -> Dict[str, Any]:
         """
         Arm the drone motors
@@ -67,57 +540,40 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Check if already armed by receiving fresh HEARTBEAT
-            if self._check_armed_state():
-                return {"status": "success", "message": "Drone is already armed"}
+        # Check if already armed by receiving fresh HEARTBEAT
+        if self._check_armed_state():
+            return {"status": "success", "message": "Drone is already armed"}
 
-            # Send arm command using MAV_CMD_COMPONENT_ARM_DISARM
-            # This is more reliable than arducopter_arm() as it gives us COMMAND_ACK
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-                0,  # confirmation
-                1,  # param1: 1 = arm, 0 = disarm
-                0,  # param2: 0 = arm normally, 21196 = force arm (bypasses checks)
-                0, 0, 0, 0, 0  # params 3-7 (unused)
-            )
+        # Send arm command using MAV_CMD_COMPONENT_ARM_DISARM
+        # This is more reliable than arducopter_arm() as it gives us COMMAND_ACK
+        self.master.mav.command_long_send(
+            self.master.target_system,
+            self.master.target_component,
+            CMD_ARM_DISARM,
+            0,  # confirmation
+            1,  # param1: 1 = arm, 0 = disarm
+            0,  # param2: 0 = arm normally, 21196 = force arm (bypasses checks)
+            0, 0, 0, 0, 0  # params 3-7 (unused)
+        )
+        self._state_sent_at = time.monotonic()
 
-            # Wait for COMMAND_ACK first
-            ack = self.master.recv_match(type='COMMAND_ACK', blocking=True, timeout=3)
-            if ack:
-                if ack.command == mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
-                    if ack.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
-                        # Arming was rejected - get reason from result code
-                        result_names = {
-                            0: "Accepted",
-                            1: "Temporarily rejected",
-                            2: "Denied",
-                            3: "Unsupported",
-                            4: "Failed",
-                            5: "In progress",
-                            6: "Cancelled"
-                        }
-                        reason = result_names.get(ack.result, f"Unknown ({ack.result})")
-                        return {"status": "error", "message": f"Arming rejected: {reason}"}
-
-            # Wait for arming confirmation via HEARTBEAT
-            # The COMMAND_ACK means command was accepted, but we verify armed state
-            arm_start = time.time()
-            while time.time() - arm_start < 5:  # 5 second timeout
-                msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=0.5)
-                if msg:
-                    # Check armed flag in base_mode
-                    if msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED:
-                        return {"status": "success", "message": "Drone armed successfully"}
-                time.sleep(0.1)
-
-            return {"status": "error", "message": "Arming timeout - check pre-arm failures"}
+        # Wait for COMMAND_ACK first
+        ack = self._wait_ack(CMD_ARM_DISARM)
+        if ack:
+            if ack.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
+                # Arming was rejected - get reason from result code
+                reason = _result_name(ack.result)
+                return {"status": "error", "message": f"Arming rejected: {reason}"}
+
+        # Wait for arming confirmation via HEARTBEAT
+        # The COMMAND_ACK means command was accepted, but we verify armed state
+        if self._wait_armed(True, timeout=5):
+            return {"status": "success", "message": "Drone armed successfully"}
+
+        return {"status": "error", "message": "Arming timeout - check pre-arm failures"}
 
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to arm: {str(e)}"}
     
+    @_mav_errors("Failed to disarm")
     def disarm(self) -> Dict[str, Any]:
         """
         Disarm the drone motors
@@ -125,43 +581,37 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Check if already disarmed
-            if not self._check_armed_state():
-                return {"status": "success", "message": "Drone is already disarmed"}
+        # Check if already disarmed
+        if not self._check_armed_state():
+            return {"status": "success", "message": "Drone is already disarmed"}
 
-            # Send disarm command using MAV_CMD_COMPONENT_ARM_DISARM
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-                0,  # confirmation
-                0,  # param1: 0 = disarm
-                0,  # param2
-                0, 0, 0, 0, 0  # params 3-7 (unused)
-            )
+        # Send disarm command using MAV_CMD_COMPONENT_ARM_DISARM
+        self.master.mav.command_long_send(
+            self.master.target_system,
+            self.master.target_component,
+            CMD_ARM_DISARM,
+            0,  # confirmation
+            0,  # param1: 0 = disarm
+            0,  # param2
+            0, 0, 0, 0, 0  # params 3-7 (unused)
+        )
+        self._state_sent_at = time.monotonic()
 
-            # Wait for COMMAND_ACK
-            ack = self.master.recv_match(type='COMMAND_ACK', blocking=True, timeout=3)
-            if ack:
-                if ack.command == mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
-                    if ack.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
-                        return {"status": "error", "message": "Disarm command rejected"}
+        # Wait for COMMAND_ACK
+        ack = self._wait_ack(CMD_ARM_DISARM)
+        if ack:
+            if ack.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
+                reason = _result_name(ack.result)
+                return {"status": "error", "message": f"Disarm command rejected: {reason}"}
 
-            # Wait for disarm confirmation via HEARTBEAT
-            disarm_start = time.time()
-            while time.time() - disarm_start < 5:
-                msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=0.5)
-                if msg:
-                    if not (msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED):
-                        return {"status": "success", "message": "Drone disarmed successfully"}
-                time.sleep(0.1)
+        # Wait for disarm confirmation via HEARTBEAT
+        if self._wait_armed(False, timeout=5):
+            return {"status": "success", "message": "Drone disarmed successfully"}
 
-            return {"status": "error", "message": "Disarm timeout"}
+        return {"status": "error", "message": "Disarm timeout"}
 
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to disarm: {str(e)}"}
     
+    @_mav_errors("Takeoff failed")
     def takeoff(self, altitude: float) -> Dict[str, Any]:
         """
         Take off to specified altitude
@@ -172,64 +622,70 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Validation
-            if altitude < 2:
-                return {"status": "error", "message": "Takeoff altitude too low (minimum 2m)"}
-            if altitude > 120:
-                return {"status": "error", "message": "Takeoff altitude too high (maximum 120m)"}
-
-            # Check if armed using reliable HEARTBEAT-based detection
-            if not self._check_armed_state():
+        # Validation
+        if not MIN_TAKEOFF_ALT <= altitude <= MAX_TAKEOFF_ALT:
+            return {
+                "status": "error",
+                "message": f"Takeoff altitude must be {MIN_TAKEOFF_ALT:g}-{MAX_TAKEOFF_ALT:g}m"
+            }
+
+        # Check armed state and mode from one HEARTBEAT
+        state = self._preflight()
+        if not state["armed"]:
+            return {
+                "status": "error",
+                "message": "Drone must be armed first. Use 'arm' command."
+            }
+            
+        # Check current mode
+        current_mode = state["mode"]
+        if current_mode is not None:
+            # Takeoff works in GUIDED and AUTO modes
+            if current_mode not in ["GUIDED", "AUTO"]:
                 return {
                     "status": "error",
-                    "message": "Drone must be armed first. Use 'arm' command."
+                    "message": f"Drone is in {current_mode} mode. Takeoff requires GUIDED mode. Should I switch to GUIDED mode?",
+                    "current_mode": current_mode,
+                    "needs_mode_change": True
                 }
             
-            # Check current mode
-            mode_info = self.get_mode()
-            if mode_info.get("status") == "success":
-                current_mode = mode_info.get("mode")
-                # Takeoff works in GUIDED and AUTO modes
-                if current_mode not in ["GUIDED", "AUTO"]:
-                    return {
-                        "status": "error",
-                        "message": f"Drone is in {current_mode} mode. Takeoff requires GUIDED mode. Should I switch to GUIDED mode?",
-                        "current_mode": current_mode,
-                        "needs_mode_change": True
-                    }
+        # Change to GUIDED mode if not already. The mode change and the
+        # takeoff are sent back-to-back and their ACKs awaited together,
+        # saving a round trip
+        commands = [CMD_TAKEOFF]
+        if current_mode != "GUIDED":
+            self._send_mode("GUIDED")
+            commands.append(CMD_SET_MODE)
             
-            # Change to GUIDED mode if not already
-            current_mode = mode_info.get("mode", "")
-            if current_mode != "GUIDED":
-                mode_result = self.change_mode("GUIDED")
-                if mode_result.get("status") != "success":
-                    return {"status": "error", "message": "Failed to switch to GUIDED mode"}
+        # Send takeoff command
+        self.master.mav.command_long_send(
+            self.master.target_system,
+            self.master.target_component,
+            CMD_TAKEOFF,
+            0,  # confirmation
+            0, 0, 0, 0,  # params 1-4
+            0, 0,  # param 5-6 (lat, lon)
+            altitude  # param 7 (altitude)
+        )
             
-            # Send takeoff command
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
-                0,  # confirmation
-                0, 0, 0, 0,  # params 1-4
-                0, 0,  # param 5-6 (lat, lon)
-                altitude  # param 7 (altitude)
-            )
+        # Wait for ACKs
+        acks = self._wait_acks(commands)
+        if CMD_SET_MODE in commands:
+            mode_ack = acks.get(CMD_SET_MODE)
+            if not mode_ack or mode_ack.result != 0:
+                return {"status": "error", "message": "Failed to switch to GUIDED mode"}
             
-            # Wait for ACK
-            ack = self.master.recv_match(type='COMMAND_ACK', blocking=True, timeout=3)
-            if ack and ack.result == 0:
-                return {
-                    "status": "success", 
-                    "message": f"Taking off to {altitude}m",
-                    "altitude": altitude
-                }
-            else:
-                return {"status": "error", "message": "Takeoff command rejected"}
-        except Exception as e:
-            return {"status": "error", "message": f"Takeoff failed: {str(e)}"}
+        ack = acks.get(CMD_TAKEOFF)
+        if ack and ack.result == 0:
+            return {
+                "status": "success", 
+                "message": f"Taking off to {altitude}m",
+                "altitude": altitude
+            }
+        else:
+            return {"status": "error", "message": "Takeoff command rejected"}
     
+    @_mav_errors("Landing failed")
     def land(self) -> Dict[str, Any]:
         """
         Land the drone at current location
@@ -237,13 +693,13 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Change to LAND mode
-            self.change_mode("LAND")
-            return {"status": "success", "message": "Landing initiated"}
-        except Exception as e:
-            return {"status": "error", "message": f"Landing failed: {str(e)}"}
+        # Change to LAND mode
+        result = self.change_mode("LAND")
+        if result.get("status") != "success":
+            return {"status": "error", "message": f"Landing failed: {result['message']}"}
+        return {"status": "success", "message": "Landing initiated"}
     
+    @_mav_errors("RTL failed")
     def rtl(self) -> Dict[str, Any]:
         """
         Return to launch (home) position
@@ -251,12 +707,12 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            self.change_mode("RTL")
-            return {"status": "success", "message": "Returning to launch"}
-        except Exception as e:
-            return {"status": "error", "message": f"RTL failed: {str(e)}"}
+        result = self.change_mode("RTL")
+        if result.get("status") != "success":
+            return {"status": "error", "message": f"RTL failed: {result['message']}"}
+        return {"status": "success", "message": "Returning to launch"}
     
+    @_mav_errors("Mode change failed")
     def change_mode(self, mode: str) -> Dict[str, Any]:
         """
         Change flight mode
@@ -267,30 +723,67 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Get mode ID
-            mode_id = self.master.mode_mapping()[mode]
+        # Nothing to do if the vehicle already reports this mode
+        if self._current_mode() == mode:
+            return {"status": "success", "message": f"Already in {mode} mode"}
             
-            # Send mode change command
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_DO_SET_MODE,
-                0,
-                mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                mode_id,
-                0, 0, 0, 0, 0
-            )
+        self._send_mode(mode)
             
-            # Wait for ACK
-            ack = self.master.recv_match(type='COMMAND_ACK', blocking=True, timeout=3)
-            if ack and ack.result == 0:
-                return {"status": "success", "message": f"Mode changed to {mode}"}
-            else:
-                return {"status": "error", "message": f"Mode change to {mode} rejected"}
-        except Exception as e:
-            return {"status": "error", "message": f"Mode change failed: {str(e)}"}
+        # Wait for ACK
+        ack = self._wait_ack(CMD_SET_MODE)
+        if ack and ack.result == 0:
+            return {"status": "success", "message": f"Mode changed to {mode}"}
+        else:
+            return {"status": "error", "message": f"Mode change to {mode} rejected"}
+    
+    def _send_mode(self, mode: str):
+        """Send a mode change command without waiting for its ACK"""
+        # Get mode ID
+        if self._mode_map is None:
+            self._load_mode_maps()
+        mode_id = self._mode_map[mode]
+        
+        # Send mode change command
+        self.master.mav.command_long_send(
+            self.master.target_system,
+            self.master.target_component,
+            CMD_SET_MODE,
+            0,
+            mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
+            mode_id,
+            0, 0, 0, 0, 0
+        )
+        self._state_sent_at = time.monotonic()
     
+    def _current_mode(self) -> Optional[str]:
+        """
+        Flight mode from the cached HEARTBEAT, or None if unknown
+        
+        Only available with the background listener. A heartbeat received
+        before the last mode command may not reflect it yet, so it doesn't
+        count.
+        """
+        with self._rx_cond:
+            msg = self._current_heartbeat()
+        if msg is None:
+            return None
+        return self._mode_name(msg.custom_mode)
+    
+    def _guided_goto(self, lat: float, lon: float, alt: float):
+        """Send a GUIDED mode position target (altitude relative to home)"""
+        self.master.mav.mission_item_send(
+            self.master.target_system,
+            self.master.target_component,
+            0,  # seq
+            FRAME_GLOBAL_REL_ALT,
+            CMD_WAYPOINT,
+            2,  # current (2 = guided mode target)
+            0,  # autocontinue
+            0, 0, 0, 0,  # params 1-4
+            lat, lon, alt
+        )
+    
+    @_mav_errors("Goto failed")
     def goto_location(self, lat: float, lon: float, alt: float) -> Dict[str, Any]:
         """
         Go to specified GPS location
@@ -303,33 +796,30 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Ensure in GUIDED mode
-            self.change_mode("GUIDED")
+        # Ensure in GUIDED mode, skipping the change if already there.
+        # The target is sent right behind the mode change; its ACK is
+        # collected afterwards instead of waited on first
+        switching = self._current_mode() != "GUIDED"
+        if switching:
+            self._send_mode("GUIDED")
             
-            # Send position target
-            self.master.mav.mission_item_send(
-                self.master.target_system,
-                self.master.target_component,
-                0,  # seq
-                mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-                2,  # current (2 = guided mode target)
-                0,  # autocontinue
-                0, 0, 0, 0,  # params 1-4
-                lat, lon, alt
-            )
+        # Send position target
+        self._guided_goto(lat, lon, alt)
             
-            return {
-                "status": "success",
-                "message": f"Flying to lat={lat}, lon={lon}, alt={alt}m",
-                "latitude": lat,
-                "longitude": lon,
-                "altitude": alt
-            }
-        except Exception as e:
-            return {"status": "error", "message": f"Goto failed: {str(e)}"}
+        if switching:
+            ack = self._wait_ack(CMD_SET_MODE)
+            if not ack or ack.result != 0:
+                return {"status": "error", "message": "Failed to switch to GUIDED mode"}
+            
+        return {
+            "status": "success",
+            "message": f"Flying to lat={lat}, lon={lon}, alt={alt}m",
+            "latitude": lat,
+            "longitude": lon,
+            "altitude": alt
+        }
     
+    @_mav_errors("Speed change failed")
     def set_speed(self, speed: float, speed_type: str = "ground") -> Dict[str, Any]:
         """
         Set vehicle speed
@@ -341,31 +831,29 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            speed_type_val = 1 if speed_type == "ground" else 0
+        speed_type_val = 1 if speed_type == "ground" else 0
             
-            self.master.mav.command_long_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED,
-                0,
-                speed_type_val,  # speed type
-                speed,  # speed (m/s)
-                -1,  # throttle (no change)
-                0, 0, 0, 0
-            )
+        self.master.mav.command_long_send(
+            self.master.target_system,
+            self.master.target_component,
+            mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED,
+            0,
+            speed_type_val,  # speed type
+            speed,  # speed (m/s)
+            -1,  # throttle (no change)
+            0, 0, 0, 0
+        )
             
-            ack = self.master.recv_match(type='COMMAND_ACK', blocking=True, timeout=3)
-            if ack and ack.result == 0:
-                return {
-                    "status": "success",
-                    "message": f"{speed_type.capitalize()} speed set to {speed} m/s"
-                }
-            else:
-                return {"status": "error", "message": "Speed change rejected"}
-        except Exception as e:
-            return {"status": "error", "message": f"Speed change failed: {str(e)}"}
+        ack = self._wait_ack(mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED)
+        if ack and ack.result == 0:
+            return {
+                "status": "success",
+                "message": f"{speed_type.capitalize()} speed set to {speed} m/s"
+            }
+        else:
+            return {"status": "error", "message": "Speed change rejected"}
     
+    @_mav_errors("Failed to get position")
     def get_position(self) -> Dict[str, Any]:
         """
         Get current drone position
@@ -373,32 +861,19 @@ class DroneController:
         Returns:
             Dictionary with latitude, longitude, altitude, and heading
         """
-        try:
-            # Request position data by sending a message request
-            # This ensures SITL sends us fresh GLOBAL_POSITION_INT data
-            self.master.mav.request_data_stream_send(
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_DATA_STREAM_POSITION,
-                2,  # rate Hz
-                1   # start
-            )
+        # The position stream is requested once in connect(); this only
+        # reads the latest GLOBAL_POSITION_INT
+        msg = self._recv('GLOBAL_POSITION_INT', 2)
+        if msg:
+            return {
+                "status": "success",
+                "latitude": msg.lat / 1e7,
+                "longitude": msg.lon / 1e7,
+                "altitude": msg.relative_alt / 1000.0,  # Convert from mm to m
+                "heading": msg.hdg / 100.0  # Convert from centidegrees
+            }
 
-            # Try to get GLOBAL_POSITION_INT message with retries
-            for _ in range(3):
-                msg = self.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True, timeout=2)
-                if msg:
-                    return {
-                        "status": "success",
-                        "latitude": msg.lat / 1e7,
-                        "longitude": msg.lon / 1e7,
-                        "altitude": msg.relative_alt / 1000.0,  # Convert from mm to m
-                        "heading": msg.hdg / 100.0  # Convert from centidegrees
-                    }
-
-            return {"status": "error", "message": "Position data not available"}
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to get position: {str(e)}"}
+        return {"status": "error", "message": "Position data not available"}
     
     def get_current_altitude(self) -> float:
         """Get current altitude in meters, returns -1 on error"""
@@ -410,6 +885,7 @@ class DroneController:
         except:
             return -1
     
+    @_mav_errors("Failed to get mode")
     def get_mode(self) -> Dict[str, Any]:
         """
         Get current flight mode
@@ -417,24 +893,21 @@ class DroneController:
         Returns:
             Dictionary with current mode name
         """
-        try:
-            msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=3)
-            if msg:
-                # Get mode from custom_mode field
-                mode_id = msg.custom_mode
-                mode_mapping_inv = {v: k for k, v in self.master.mode_mapping().items()}
-                mode_name = mode_mapping_inv.get(mode_id, "UNKNOWN")
+        msg = self._heartbeat(3)
+        if msg:
+            # Get mode from custom_mode field
+            mode_id = msg.custom_mode
+            mode_name = self._mode_name(mode_id) or "UNKNOWN"
                 
-                return {
-                    "status": "success",
-                    "mode": mode_name,
-                    "mode_id": mode_id
-                }
-            else:
-                return {"status": "error", "message": "Cannot get mode"}
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to get mode: {str(e)}"}
+            return {
+                "status": "success",
+                "mode": mode_name,
+                "mode_id": mode_id
+            }
+        else:
+            return {"status": "error", "message": "Cannot get mode"}
     
+    @_mav_errors("Failed to check armable status")
     def is_armable(self) -> Dict[str, Any]:
         """
         Check if drone is ready to arm
@@ -442,57 +915,53 @@ class DroneController:
         Returns:
             Dictionary with armable status and reasons
         """
-        try:
-            msg = self.master.recv_match(type='SYS_STATUS', blocking=True, timeout=3)
-            if not msg:
-                return {"status": "error", "message": "Cannot get system status"}
-            
-            # Check sensors health (onboard_control_sensors_health)
-            sensors_ok = (msg.onboard_control_sensors_health & 
-                         msg.onboard_control_sensors_enabled) == msg.onboard_control_sensors_enabled
+        # Check if already armed using reliable HEARTBEAT-based detection;
+        # nothing else matters then, so skip the status/GPS reads
+        if self._check_armed_state():
+            return {
+                "status": "success",
+                "armable": False,
+                "reason": "Already armed"
+            }
             
-            issues = []
+        msg = self._recv('SYS_STATUS', 3)
+        if not msg:
+            return {"status": "error", "message": "Cannot get system status"}
             
-            # Check GPS
-            gps_msg = self.master.recv_match(type='GPS_RAW_INT', blocking=True, timeout=1)
-            if gps_msg:
-                if gps_msg.fix_type < 3:  # Less than 3D fix
-                    issues.append("GPS fix not adequate (need 3D fix)")
-            else:
-                issues.append("No GPS data")
+        # Check sensors health (onboard_control_sensors_health)
+        sensors_ok = (msg.onboard_control_sensors_health & 
+                     msg.onboard_control_sensors_enabled) == msg.onboard_control_sensors_enabled
             
-            # Check battery
-            if msg.voltage_battery < 10000:  # Less than 10V (mV)
-                issues.append("Battery voltage too low")
+        issues = []
             
-            # Check if already armed using reliable HEARTBEAT-based detection
-            if self._check_armed_state():
-                return {
-                    "status": "success",
-                    "armable": False,
-                    "reason": "Already armed"
-                }
+        # Check GPS
+        gps_msg = self._recv('GPS_RAW_INT', 1)
+        if gps_msg:
+            if gps_msg.fix_type < 3:  # Less than 3D fix
+                issues.append("GPS fix not adequate (need 3D fix)")
+        else:
+            issues.append("No GPS data")
             
-            if issues:
-                return {
-                    "status": "success",
-                    "armable": False,
-                    "issues": issues,
-                    "message": "Pre-arm checks failed: " + ", ".join(issues)
-                }
+        # Check battery
+        if msg.voltage_battery < 10000:  # Less than 10V (mV)
+            issues.append("Battery voltage too low")
             
+        if issues:
             return {
                 "status": "success",
-                "armable": True,
-                "message": "Ready to arm"
+                "armable": False,
+                "issues": issues,
+                "message": "Pre-arm checks failed: " + ", ".join(issues)
             }
             
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Failed to check armable status: {str(e)}"
-            }
+        return {
+            "status": "success",
+            "armable": True,
+            "message": "Ready to arm"
+        }
+            
     
+    @_mav_errors("Failed to get battery")
     def get_battery(self) -> Dict[str, Any]:
         """
         Get battery status
@@ -500,21 +969,19 @@ class DroneController:
         Returns:
             Dictionary with battery voltage, current, and remaining percentage
         """
-        try:
-            msg = self.master.recv_match(type='SYS_STATUS', blocking=True, timeout=3)
+        msg = self._recv('SYS_STATUS', 3)
             
-            if msg:
-                return {
-                    "status": "success",
-                    "voltage": msg.voltage_battery / 1000.0,  # Convert from mV to V
-                    "current": msg.current_battery / 100.0,  # Convert from cA to A
-                    "remaining": msg.battery_remaining  # Percentage
-                }
-            else:
-                return {"status": "error", "message": "Battery data not available"}
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to get battery: {str(e)}"}
+        if msg:
+            return {
+                "status": "success",
+                "voltage": msg.voltage_battery / 1000.0,  # Convert from mV to V
+                "current": msg.current_battery / 100.0,  # Convert from cA to A
+                "remaining": msg.battery_remaining  # Percentage
+            }
+        else:
+            return {"status": "error", "message": "Battery data not available"}
     
+    @_mav_errors("Altitude increase failed")
     def increase_altitude(self, meters: float) -> Dict[str, Any]:
         """
         Increase altitude by specified meters (relative to current altitude)
@@ -525,58 +992,39 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Validation
-            if meters <= 0:
-                return {"status": "error", "message": "Altitude increase must be positive"}
-
-            if meters > 100:
-                return {"status": "error", "message": "Altitude increase too large (max 100m at once)"}
+        # Validation
+        if not 0 < meters <= MAX_ALT_CHANGE:
+            return {
+                "status": "error",
+                "message": f"Altitude increase must be positive (max {MAX_ALT_CHANGE:g}m at once)"
+            }
 
-            # Check if armed
-            if not self._check_armed_state():
-                return {"status": "error", "message": "Vehicle must be armed"}
+        # Check armed state and position in one pass
+        state = self._preflight()
+        if not state["armed"]:
+            return {"status": "error", "message": "Vehicle must be armed"}
 
-            # Get current altitude with retries
-            current_alt = self.get_current_altitude()
-            if current_alt < 0:
-                return {"status": "error", "message": "Cannot get current altitude - position data unavailable"}
+        current_alt = state["altitude"]
+        if current_alt is None:
+            return {"status": "error", "message": "Cannot get current altitude - position data unavailable"}
 
-            if current_alt < 0.5:
-                return {"status": "error", "message": "Vehicle not airborne, use takeoff command"}
+        if current_alt < 0.5:
+            return {"status": "error", "message": "Vehicle not airborne, use takeoff command"}
             
-            target_alt = current_alt + meters
+        target_alt = current_alt + meters
             
-            # Send position target with new altitude
-            self.change_mode("GUIDED")
+        # Send position target with new altitude
+        self.change_mode("GUIDED")
+        self._guided_goto(state["lat"], state["lon"], target_alt)
             
-            msg = self.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True, timeout=3)
-            if not msg:
-                return {"status": "error", "message": "Cannot get current position"}
-            
-            self.master.mav.mission_item_send(
-                self.master.target_system,
-                self.master.target_component,
-                0,
-                mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-                2,  # current
-                0,  # autocontinue
-                0, 0, 0, 0,
-                msg.lat / 1e7,
-                msg.lon / 1e7,
-                target_alt
-            )
-            
-            return {
-                "status": "success",
-                "message": f"Climbing {meters}m to {target_alt}m",
-                "current_altitude": current_alt,
-                "target_altitude": target_alt
-            }
-        except Exception as e:
-            return {"status": "error", "message": f"Altitude increase failed: {str(e)}"}
+        return {
+            "status": "success",
+            "message": f"Climbing {meters}m to {target_alt}m",
+            "current_altitude": current_alt,
+            "target_altitude": target_alt
+        }
     
+    @_mav_errors("Altitude decrease failed")
     def decrease_altitude(self, meters: float) -> Dict[str, Any]:
         """
         Decrease altitude by specified meters (relative to current altitude)
@@ -587,61 +1035,41 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Validation
-            if meters <= 0:
-                return {"status": "error", "message": "Altitude decrease must be positive"}
+        # Validation
+        if meters <= 0:
+            return {"status": "error", "message": "Altitude decrease must be positive"}
 
-            # Check if armed
-            if not self._check_armed_state():
-                return {"status": "error", "message": "Vehicle must be armed"}
+        # Check armed state and position in one pass
+        state = self._preflight()
+        if not state["armed"]:
+            return {"status": "error", "message": "Vehicle must be armed"}
 
-            # Get current altitude
-            current_alt = self.get_current_altitude()
-            if current_alt < 0:
-                return {"status": "error", "message": "Cannot get current altitude - position data unavailable"}
+        current_alt = state["altitude"]
+        if current_alt is None:
+            return {"status": "error", "message": "Cannot get current altitude - position data unavailable"}
 
-            if current_alt < 0.5:
-                return {"status": "error", "message": "Already on ground"}
-            
-            target_alt = current_alt - meters
-            
-            # Safety check - don't go below 1 meter
-            if target_alt < 1.0:
-                return {
-                    "status": "error", 
-                    "message": f"Target altitude {target_alt:.1f}m too low, use land command instead"
-                }
-            
-            # Send position target with new altitude
-            self.change_mode("GUIDED")
-            
-            msg = self.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True, timeout=3)
-            if not msg:
-                return {"status": "error", "message": "Cannot get current position"}
+        if current_alt < 0.5:
+            return {"status": "error", "message": "Already on ground"}
             
-            self.master.mav.mission_item_send(
-                self.master.target_system,
-                self.master.target_component,
-                0,
-                mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-                2,  # current
-                0,  # autocontinue
-                0, 0, 0, 0,
-                msg.lat / 1e7,
-                msg.lon / 1e7,
-                target_alt
-            )
+        target_alt = current_alt - meters
             
+        # Safety check - don't go below 1 meter
+        if target_alt < 1.0:
             return {
-                "status": "success",
-                "message": f"Descending {meters}m to {target_alt}m",
-                "current_altitude": current_alt,
-                "target_altitude": target_alt
+                "status": "error", 
+                "message": f"Target altitude {target_alt:.1f}m too low, use land command instead"
             }
-        except Exception as e:
-            return {"status": "error", "message": f"Altitude decrease failed: {str(e)}"}
+            
+        # Send position target with new altitude
+        self.change_mode("GUIDED")
+        self._guided_goto(state["lat"], state["lon"], target_alt)
+            
+        return {
+            "status": "success",
+            "message": f"Descending {meters}m to {target_alt}m",
+            "current_altitude": current_alt,
+            "target_altitude": target_alt
+        }
     
     def move_north(self, meters: float) -> Dict[str, Any]:
         """Move north by specified meters"""
@@ -659,6 +1087,7 @@ class DroneController:
         """Move west by specified meters"""
         return self.move_relative(north=0, east=-meters, down=0)
     
+    @_mav_errors("Relative movement failed")
     def move_relative(self, north: float, east: float, down: float) -> Dict[str, Any]:
         """
         Move relative to current position in NED (North-East-Down) frame
@@ -671,63 +1100,58 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            # Validation
-            if abs(north) > 1000 or abs(east) > 1000:
-                return {"status": "error", "message": "Movement distance too large (max 1000m)"}
-
-            # Check if armed first (must be armed for any movement)
-            if not self._check_armed_state():
-                return {"status": "error", "message": "Vehicle must be armed for movement"}
-
-            # Check if airborne by getting altitude
-            current_alt = self.get_current_altitude()
-            if current_alt < 0:
-                # Could not get altitude, check if we might still be flying
-                # by verifying we're armed and in a flying mode
-                mode_info = self.get_mode()
-                current_mode = mode_info.get("mode", "")
-                if current_mode not in ["GUIDED", "AUTO", "LOITER", "POSHOLD"]:
-                    return {"status": "error", "message": "Cannot get altitude. Ensure vehicle is in GUIDED mode."}
-                # If armed and in flight mode, proceed cautiously
-            elif current_alt < 0.5:
-                return {"status": "error", "message": "Vehicle must be airborne for relative movement. Use takeoff first."}
-
-            # Ensure in GUIDED mode
-            self.change_mode("GUIDED")
-            
-            # Send SET_POSITION_TARGET_LOCAL_NED
-            self.master.mav.set_position_target_local_ned_send(
-                0,  # time_boot_ms
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_FRAME_LOCAL_OFFSET_NED,
-                0b0000111111111000,  # type_mask (only positions enabled)
-                north, east, down,
-                0, 0, 0,  # vx, vy, vz
-                0, 0, 0,  # afx, afy, afz
-                0, 0  # yaw, yaw_rate
-            )
+        # Validation
+        if max(abs(north), abs(east)) > MAX_MOVE_DISTANCE:
+            return {"status": "error", "message": f"Movement distance too large (max {MAX_MOVE_DISTANCE:g}m)"}
+
+        # Check armed state, mode and altitude in one pass
+        # (must be armed for any movement)
+        state = self._preflight()
+        if not state["armed"]:
+            return {"status": "error", "message": "Vehicle must be armed for movement"}
+
+        # Check if airborne by getting altitude
+        current_alt = state["altitude"]
+        if current_alt is None:
+            # Could not get altitude, check if we might still be flying
+            # by verifying we're armed and in a flying mode
+            current_mode = state["mode"]
+            if current_mode not in ["GUIDED", "AUTO", "LOITER", "POSHOLD"]:
+                return {"status": "error", "message": "Cannot get altitude. Ensure vehicle is in GUIDED mode."}
+            # If armed and in flight mode, proceed cautiously
+        elif current_alt < 0.5:
+            return {"status": "error", "message": "Vehicle must be airborne for relative movement. Use takeoff first."}
+
+        # Ensure in GUIDED mode
+        self.change_mode("GUIDED")
             
-            direction = []
-            if north > 0: direction.append(f"{north}m north")
-            elif north < 0: direction.append(f"{abs(north)}m south")
-            if east > 0: direction.append(f"{east}m east")
-            elif east < 0: direction.append(f"{abs(east)}m west")
-            if down > 0: direction.append(f"{down}m down")
-            elif down < 0: direction.append(f"{abs(down)}m up")
+        # Send SET_POSITION_TARGET_LOCAL_NED
+        self.master.mav.set_position_target_local_ned_send(
+            0,  # time_boot_ms
+            self.master.target_system,
+            self.master.target_component,
+            mavutil.mavlink.MAV_FRAME_LOCAL_OFFSET_NED,
+            0b0000111111111000,  # type_mask (only positions enabled)
+            north, east, down,
+            0, 0, 0,  # vx, vy, vz
+            0, 0, 0,  # afx, afy, afz
+            0, 0  # yaw, yaw_rate
+        )
             
-            direction_str = ", ".join(direction) if direction else "no movement"
+        direction = [
+            f"{abs(value)}m {labels[value > 0]}"
+            for labels, value in zip(AXIS_LABELS, (north, east, down))
+            if value
+        ]
+        direction_str = ", ".join(direction) if direction else "no movement"
             
-            return {
-                "status": "success",
-                "message": f"Moving {direction_str}",
-                "north": north,
-                "east": east,
-                "down": down
-            }
-        except Exception as e:
-            return {"status": "error", "message": f"Relative movement failed: {str(e)}"}
+        return {
+            "status": "success",
+            "message": f"Moving {direction_str}",
+            "north": north,
+            "east": east,
+            "down": down
+        }
     
     def create_mission(self) -> Dict[str, Any]:
         """
@@ -756,17 +1180,17 @@ class DroneController:
         if not self.mission_mode:
             return {"status": "error", "message": "Call create_mission first"}
         
-        if altitude < 2 or altitude > 120:
-            return {"status": "error", "message": "Takeoff altitude must be 2-120m"}
+        if not MIN_TAKEOFF_ALT <= altitude <= MAX_TAKEOFF_ALT:
+            return {"status": "error", "message": f"Takeoff altitude must be {MIN_TAKEOFF_ALT:g}-{MAX_TAKEOFF_ALT:g}m"}
         
         # Takeoff waypoint
-        waypoint = {
-            "seq": len(self.mission_items),
-            "frame": mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-            "command": mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
-            "param1": 0, "param2": 0, "param3": 0, "param4": 0,
-            "x": 0, "y": 0, "z": altitude
-        }
+        waypoint = MissionItem(
+            seq=len(self.mission_items),
+            frame=FRAME_GLOBAL_REL_ALT,
+            command=CMD_TAKEOFF,
+            param1=0, param2=0, param3=0, param4=0,
+            x=0, y=0, z=altitude
+        )
         self.mission_items.append(waypoint)
         
         return {
@@ -790,16 +1214,16 @@ class DroneController:
             return {"status": "error", "message": "Call create_mission first"}
         
         # Validation
-        if alt < 1 or alt > 500:
-            return {"status": "error", "message": "Altitude must be 1-500m"}
-        
-        waypoint = {
-            "seq": len(self.mission_items),
-            "frame": mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-            "command": mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-            "param1": 0, "param2": 0, "param3": 0, "param4": 0,
-            "x": lat, "y": lon, "z": alt
-        }
+        if not MIN_WAYPOINT_ALT <= alt <= MAX_WAYPOINT_ALT:
+            return {"status": "error", "message": f"Altitude must be {MIN_WAYPOINT_ALT:g}-{MAX_WAYPOINT_ALT:g}m"}
+        
+        waypoint = MissionItem(
+            seq=len(self.mission_items),
+            frame=FRAME_GLOBAL_REL_ALT,
+            command=CMD_WAYPOINT,
+            param1=0, param2=0, param3=0, param4=0,
+            x=round(lat * GLOBAL_XY_SCALE), y=round(lon * GLOBAL_XY_SCALE), z=alt
+        )
         self.mission_items.append(waypoint)
         
         return {
@@ -822,13 +1246,14 @@ class DroneController:
         if not self.mission_mode:
             return {"status": "error", "message": "Call create_mission first"}
         
-        waypoint = {
-            "seq": len(self.mission_items),
-            "frame": mavutil.mavlink.MAV_FRAME_LOCAL_NED,
-            "command": mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-            "param1": 0, "param2": 0, "param3": 0, "param4": 0,
-            "x": north, "y": east, "z": -alt  # NED uses down as positive
-        }
+        waypoint = MissionItem(
+            seq=len(self.mission_items),
+            frame=FRAME_LOCAL_NED,
+            command=CMD_WAYPOINT,
+            param1=0, param2=0, param3=0, param4=0,
+            x=round(north * LOCAL_XY_SCALE), y=round(east * LOCAL_XY_SCALE),
+            z=-alt  # NED uses down as positive
+        )
         self.mission_items.append(waypoint)
         
         return {
@@ -846,13 +1271,13 @@ class DroneController:
         if not self.mission_mode:
             return {"status": "error", "message": "Call create_mission first"}
         
-        waypoint = {
-            "seq": len(self.mission_items),
-            "frame": mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-            "command": mavutil.mavlink.MAV_CMD_NAV_LAND,
-            "param1": 0, "param2": 0, "param3": 0, "param4": 0,
-            "x": 0, "y": 0, "z": 0
-        }
+        waypoint = MissionItem(
+            seq=len(self.mission_items),
+            frame=FRAME_GLOBAL_REL_ALT,
+            command=CMD_LAND,
+            param1=0, param2=0, param3=0, param4=0,
+            x=0, y=0, z=0
+        )
         self.mission_items.append(waypoint)
         
         return {
@@ -870,18 +1295,11 @@ class DroneController:
         if not self.mission_items:
             return {"status": "error", "message": "No mission items"}
         
-        summary = []
-        for i, wp in enumerate(self.mission_items):
-            cmd = wp["command"]
-            if cmd == mavutil.mavlink.MAV_CMD_NAV_TAKEOFF:
-                summary.append(f"{i+1}. Takeoff to {wp['z']}m")
-            elif cmd == mavutil.mavlink.MAV_CMD_NAV_WAYPOINT:
-                if wp['frame'] == mavutil.mavlink.MAV_FRAME_LOCAL_NED:
-                    summary.append(f"{i+1}. Go to ({wp['x']}m N, {wp['y']}m E, {-wp['z']}m alt)")
-                else:
-                    summary.append(f"{i+1}. Go to ({wp['x']}, {wp['y']}, {wp['z']}m)")
-            elif cmd == mavutil.mavlink.MAV_CMD_NAV_LAND:
-                summary.append(f"{i+1}. Land")
+        summary = [
+            f"{i}. {SUMMARY_FORMATS[wp.command](wp)}"
+            for i, wp in enumerate(self.mission_items, 1)
+            if wp.command in SUMMARY_FORMATS
+        ]
         
         return {
             "status": "success",
@@ -889,6 +1307,7 @@ class DroneController:
             "summary": "\n".join(summary)
         }
     
+    @_mav_errors("Mission upload failed")
     def upload_mission(self) -> Dict[str, Any]:
         """
         Upload mission to vehicle
@@ -899,56 +1318,69 @@ class DroneController:
         if not self.mission_items:
             return {"status": "error", "message": "No mission to upload"}
         
-        try:
-            # Clear existing mission
-            self.master.mav.mission_clear_all_send(
-                self.master.target_system,
-                self.master.target_component
-            )
-            
-            # Wait for ACK
-            ack = self.master.recv_match(type='MISSION_ACK', blocking=True, timeout=3)
+        if self._rx_thread is not None:
+            self._drain('MISSION_ACK')
+            self._drain('MISSION_REQUEST')
+        
+        # Clear existing mission
+        self.master.mav.mission_clear_all_send(
+            self.master.target_system,
+            self.master.target_component
+        )
+        
+        # Wait for its ACK (not checked: a lost one doesn't stop the
+        # upload, and the final ACK reports the outcome)
+        self._recv('MISSION_ACK', 3)
+        
+        # Send mission count
+        self.master.mav.mission_count_send(
+            self.master.target_system,
+            self.master.target_component,
+            len(self.mission_items)
+        )
+        
+        # Send each waypoint the vehicle asks for, by the seq it asks for,
+        # so a repeated request after a lost item gets the right one again.
+        # MISSION_ITEM_INT keeps full lat/lon precision (float32 doesn't);
+        # items are stored in its units already
+        last_seq = len(self.mission_items) - 1
+        while True:
+            msg = self._recv('MISSION_REQUEST', 3)
+            if not msg:
+                return {"status": "error", "message": "Timeout waiting for mission request"}
+            # Autopilots resend a request until the item arrives; answer
+            # only the newest one waiting so a backlog of retransmits
+            # doesn't turn into a burst of duplicate items
+            msg = self._newest('MISSION_REQUEST', msg)
+            if msg.seq > last_seq:
+                return {"status": "error", "message": f"Vehicle requested unknown waypoint {msg.seq}"}
             
-            # Send mission count
-            self.master.mav.mission_count_send(
+            wp = self.mission_items[msg.seq]
+            self.master.mav.mission_item_int_send(
                 self.master.target_system,
                 self.master.target_component,
-                len(self.mission_items)
+                wp.seq,
+                wp.frame,
+                wp.command,
+                0,  # current
+                1,  # autocontinue
+                wp.param1, wp.param2, wp.param3, wp.param4,
+                wp.x, wp.y, wp.z
             )
-            
-            # Upload each waypoint
-            for wp in self.mission_items:
-                # Wait for mission request
-                msg = self.master.recv_match(type='MISSION_REQUEST', blocking=True, timeout=3)
-                if not msg:
-                    return {"status": "error", "message": "Timeout waiting for mission request"}
-                
-                # Send waypoint
-                self.master.mav.mission_item_send(
-                    self.master.target_system,
-                    self.master.target_component,
-                    wp["seq"],
-                    wp["frame"],
-                    wp["command"],
-                    0,  # current
-                    1,  # autocontinue
-                    wp["param1"], wp["param2"], wp["param3"], wp["param4"],
-                    wp["x"], wp["y"], wp["z"]
-                )
-            
-            # Wait for final ACK
-            ack = self.master.recv_match(type='MISSION_ACK', blocking=True, timeout=3)
-            if ack and ack.type == 0:
-                return {
-                    "status": "success",
-                    "message": f"Mission uploaded successfully ({len(self.mission_items)} waypoints)"
-                }
-            else:
-                return {"status": "error", "message": "Mission upload failed"}
-                
-        except Exception as e:
-            return {"status": "error", "message": f"Mission upload failed: {str(e)}"}
+            if msg.seq == last_seq:
+                break
+        
+        # Wait for final ACK
+        ack = self._recv('MISSION_ACK', 3)
+        if ack and ack.type == 0:
+            return {
+                "status": "success",
+                "message": f"Mission uploaded successfully ({len(self.mission_items)} waypoints)"
+            }
+        else:
+            return {"status": "error", "message": "Mission upload failed"}
     
+    @_mav_errors("Failed to start mission")
     def start_mission(self) -> Dict[str, Any]:
         """
         Start executing uploaded mission (change to AUTO mode)
@@ -956,14 +1388,13 @@ class DroneController:
         Returns:
             Dictionary with status and message
         """
-        try:
-            self.change_mode("AUTO")
-            return {
-                "status": "success",
-                "message": "Mission started (AUTO mode)"
-            }
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to start mission: {str(e)}"}
+        result = self.change_mode("AUTO")
+        if result.get("status") != "success":
+            return {"status": "error", "message": f"Failed to start mission: {result['message']}"}
+        return {
+            "status": "success",
+            "message": "Mission started (AUTO mode)"
+        }
     
     def clear_mission(self) -> Dict[str, Any]:
         """
@@ -981,9 +1412,10 @@ class DroneController:
 
 
 # Function definitions for FunctionGemma
-# These will be provided to the model in the proper format
+# These will be provided to the model in the proper format. Read-only: the
+# table is shared by the REPLs' help and dispatch code
 
-DRONE_FUNCTIONS = {
+DRONE_FUNCTIONS = MappingProxyType({
     "arm": {
         "name": "arm",
         "description": "Arm the drone motors to prepare for flight. The drone must be armed before takeoff.",
@@ -1232,4 +1664,4 @@ DRONE_FUNCTIONS = {
         "description": "Clear the current mission plan",
         "parameters": {}
     }
-}
\ No newline at end of file
+})
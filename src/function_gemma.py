@@ -3,23 +3,298 @@ FunctionGemma Communication Module
 Handles communication with Ollama FunctionGemma model for drone control
 """
 
+import asyncio
+import logging
 import ollama
+import os
 import re
 import json
-from typing import Dict, Any, Optional
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Per-command trace ([PREPROCESSED], [FAST], [CACHED], [PARSED]) is logged at
+# DEBUG; failures at WARNING/ERROR
+logger = logging.getLogger(__name__)
+
+# Default Ollama model. Set MODEL_NAME to pin another tag, such as a
+# quantized build (see models/README.md)
+DEFAULT_MODEL = os.environ.get("MODEL_NAME", "ardupilot-stage1")
+
+# Keep the model resident in Ollama between commands (-1 = never unload),
+# so interactive commands don't pay the model load time again
+KEEP_ALIVE = -1
+
+# Seconds to wait on the Ollama server (to connect, or for the next chunk
+# of a reply) before the command fails. Without it a stalled server (out of
+# memory, model reload) leaves the prompt hanging forever. Loading the
+# 270M model takes a few seconds, so warmup() fits comfortably too.
+REQUEST_TIMEOUT = 30.0
+
+# Context sizing. The function declarations baked into the Modelfile template
+# take roughly TEMPLATE_TOKENS, and a function call reply fits in
+# RESPONSE_TOKENS. The context is rounded up to a power of two no smaller
+# than MIN_NUM_CTX, so nearly every command lands in the same bucket and
+# Ollama doesn't reload the model for a new context size.
+TEMPLATE_TOKENS = 512
+RESPONSE_TOKENS = 96
+MIN_NUM_CTX = 1024
+
+# Generation options sent with every request. num_predict caps a reply at
+# RESPONSE_TOKENS: the longest call (goto_location with full-precision
+# coordinates, one token per digit) is about 50 tokens, so a model that
+# rambles past the call is cut off instead of running to the context limit
+DEFAULT_OPTIONS = {
+    'temperature': 0.1,
+    'num_predict': RESPONSE_TOKENS,
+}
+
+# Shared client for single requests, so connections are reused
+_client = ollama.Client(timeout=REQUEST_TIMEOUT)
+
+# Maximum number of parsed commands kept in the in-process cache
+CACHE_SIZE = 256
+
+# Default location of the optional on-disk cache, which keeps parsed
+# commands across runs (see FunctionGemmaInterface cache_db)
+CACHE_DB = os.path.join(os.path.expanduser("~"), ".cache", "ap_offline_chat_tool", "responses.db")
+
+# Marks the end of a function call in the model output
+END_CALL = '<end_function_call>'
+
+# <start_function_call>call:function_name{args}<end_function_call>
+_CALL_RE = re.compile(r'<start_function_call>call:(\w+)\{([^}]*)\}<end_function_call>')
+
+# key:value pairs inside the call arguments (quoted values may contain commas)
+_KV_RE = re.compile(r'(\w+)\s*:\s*("[^"]*"|[^,]+)')
+
+# Numeric argument values, matched against the whole value
+_INT_RE = re.compile(r'[+-]?\d+')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?')
+
+# Takeoff phrasings rewritten by preprocess_command to "takeoff to X meters":
+# "takeoff 20", "take off 20", "takeoff drone 20", "take off drone 20",
+# "takeoff at 20", "takeoff drone at 20", each with an optional "m"/"meters"
+_TAKEOFF_RE = re.compile(
+    r'\btake\s*off(?:\s+drone)?(?:\s+at)?\s+(\d+(?:\.\d+)?)(?!\.?\d)(?:\s*(?:meters?|m)\b)?'
+)
+
+# Unambiguous commands that are answered without calling the model.
+# Patterns must match the whole (preprocessed, normalized) command, so
+# compound commands like "arm the drone and takeoff" still go to the model.
+# Named groups become the function arguments.
+_DRONE = r'(?:\s+(?:the\s+)?(?:drone|vehicle|copter))?'
+_FAST_PATHS = [
+    (re.compile(r'(?:please\s+)?arm' + _DRONE), 'arm'),
+    (re.compile(r'(?:please\s+)?disarm' + _DRONE), 'disarm'),
+    (re.compile(r'(?:please\s+)?land' + _DRONE + r'(?:\s+now)?'), 'land'),
+    (re.compile(r'rtl|return\s+to\s+(?:launch|home)|return\s+home|go\s+home'), 'rtl'),
+    (re.compile(r'(?:check\s+)?(?:the\s+)?battery(?:\s+(?:status|level))?'), 'get_battery'),
+    (re.compile(r'where\s+am\s+i|(?:get\s+)?(?:current\s+)?position'), 'get_position'),
+    (re.compile(r'takeoff\s+to\s+(?P<altitude>\d+(?:\.\d+)?)\s*(?:meters?|m)'), 'takeoff'),
+    (re.compile(r'(?:get\s+|check\s+|what(?:\'s|\s+is)\s+)?(?:the\s+)?(?:current\s+)?(?:flight\s+)?mode'), 'get_mode'),
+    (re.compile(r'(?:is\s+(?:it|the\s+drone)\s+)?(?:armable|ready\s+to\s+arm)|can\s+i\s+arm' + _DRONE), 'is_armable'),
+] + [
+    (re.compile(r'(?:move|go|fly)\s+' + direction + r'\s+(?:by\s+)?(?P<meters>\d+(?:\.\d+)?)(?:\s*(?:meters?|m))?'),
+     'move_' + direction)
+    for direction in ('north', 'south', 'east', 'west')
+]
+
+
+def _format_battery(result: Dict[str, Any]) -> str:
+    """get_battery result as voltage, current and charge"""
+    voltage = result.get('voltage', 0.0)
+    current = result.get('current', 0.0)
+    remaining = result.get('remaining', 0)
+    return f"Battery: {voltage:.2f}V, {current:.2f}A, {remaining}% remaining"
+
+
+def _format_position(result: Dict[str, Any]) -> str:
+    """get_position result as lat/lon, altitude and heading"""
+    lat = result.get('latitude', 0.0)
+    lon = result.get('longitude', 0.0)
+    alt = result.get('altitude', 0.0)
+    heading = result.get('heading', 0.0)
+    return f"Position: Lat {lat:.6f}°, Lon {lon:.6f}°, Alt {alt:.1f}m, Heading {heading:.1f}°"
+
+
+def _format_mode(result: Dict[str, Any]) -> str:
+    """get_mode result"""
+    return f"Current mode: {result.get('mode', 'UNKNOWN')}"
+
+
+def _format_armable(result: Dict[str, Any]) -> str:
+    """is_armable result, with the reasons when not armable"""
+    if result.get('armable', False):
+        return "Drone is ready to arm"
+    reasons = result.get('reasons', [])
+    reason_text = ", ".join(reasons) if reasons else "Unknown reasons"
+    return f"WARNING: Drone not ready to arm: {reason_text}"
+
+
+# Special formatting for data-returning functions (see format_result_message);
+# everything else shows the result's own message
+_RESULT_FORMATTERS = {
+    'get_battery': _format_battery,
+    'get_position': _format_position,
+    'get_mode': _format_mode,
+    'is_armable': _format_armable,
+}
+
+
+def _normalize(command: str) -> str:
+    """Collapse whitespace and drop trailing punctuation from a command"""
+    return " ".join(command.split()).rstrip(".!?")
+
+
+def _convert_value(value: str) -> Any:
+    """Convert an argument string to int or float when it is numeric"""
+    if _INT_RE.fullmatch(value):
+        return int(value)
+    if _FLOAT_RE.fullmatch(value):
+        return float(value)
+    return value
+
 
 class FunctionGemmaInterface:
     """Interface for communicating with FunctionGemma via Ollama"""
     
-    def __init__(self, model_name: str = "ardupilot-stage1"):
+    __slots__ = ('model_name', 'options', 'conversation_history', '_cache', '_db', 'fast_path')
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache_db: Optional[str] = None):
         """
         Initialize FunctionGemma interface
         
         Args:
-            model_name: Name of the Ollama model to use (default: ardupilot-stage1)
+            model_name: Name of the Ollama model to use (default: $MODEL_NAME or ardupilot-stage1)
+            cache_db: SQLite file that keeps parsed commands across runs
+                (e.g. CACHE_DB); None keeps the cache in memory only
         """
         self.model_name = model_name
+        self.options = dict(DEFAULT_OPTIONS)
         self.conversation_history = []
+        self._cache = OrderedDict()  # (model, normalized command) -> parsed call
+        self._db = self._open_cache_db(cache_db) if cache_db else None
+        self.fast_path = True  # Answer unambiguous commands without the model
+    
+    def _open_cache_db(self, path: str) -> Optional[sqlite3.Connection]:
+        """Open (creating if needed) the on-disk command cache"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # The REPLs may call the model from a worker thread
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "model TEXT, command TEXT, result TEXT, created REAL, "
+                "PRIMARY KEY (model, command))"
+            )
+            return db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("[WARN] Could not open cache database %s: %s", path, e)
+            return None
+    
+    def _db_get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Look up a command in the on-disk cache"""
+        try:
+            row = self._db.execute(
+                "SELECT result FROM responses WHERE model = ? AND command = ?", key
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("[WARN] Cache database read failed: %s", e)
+            return None
+        return json.loads(row[0]) if row else None
+    
+    def _db_put(self, key: tuple, result: Dict[str, Any]):
+        """Store a parsed command in the on-disk cache"""
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    key + (json.dumps(result), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("[WARN] Cache database write failed: %s", e)
+    
+    def warmup(self) -> bool:
+        """
+        Load the model into Ollama memory before the first command.
+        
+        An empty prompt makes Ollama load the model without generating,
+        and KEEP_ALIVE pins it so later commands skip the load entirely.
+        The model is loaded with the same num_ctx a short command uses;
+        otherwise the first command would reload it.
+        
+        Returns:
+            True if the model was loaded, False otherwise
+        """
+        try:
+            _client.generate(
+                model=self.model_name,
+                prompt='',
+                options=dict(self.options, num_ctx=self._estimate_ctx('')),
+                keep_alive=KEEP_ALIVE
+            )
+            return True
+        except Exception as e:
+            logger.warning("[WARN] Could not preload model: %s", e)
+            return False
+    
+    def _estimate_ctx(self, prompt: str) -> int:
+        """
+        Estimate the context window needed for a single command.
+        
+        Ollama otherwise allocates the Modelfile's full num_ctx for every
+        request, even for one-line commands like "arm the drone".
+        
+        Args:
+            prompt: User prompt that will be sent to the model
+            
+        Returns:
+            Context size in tokens (power of two, at least MIN_NUM_CTX)
+        """
+        needed = len(prompt) // 3 + TEMPLATE_TOKENS + RESPONSE_TOKENS
+        num_ctx = MIN_NUM_CTX
+        while num_ctx < needed:
+            num_ctx *= 2
+        return num_ctx
+    
+    def _cache_key(self, processed_input: str) -> tuple:
+        """
+        Build the cache key for a preprocessed command.
+        
+        Whitespace and trailing punctuation are normalized so that
+        "ARM THE DRONE!" and "arm the  drone" share one entry.
+        """
+        return (self.model_name, _normalize(processed_input))
+    
+    def match_fast_path(self, processed_input: str) -> Optional[Dict[str, Any]]:
+        """
+        Match trivially unambiguous commands without calling the model
+        
+        Args:
+            processed_input: Preprocessed command (see preprocess_command)
+            
+        Returns:
+            Dictionary with function_name and arguments, or None if the
+            command needs the model
+            
+        Example:
+            >>> match_fast_path("arm the drone")
+            {'function_name': 'arm', 'arguments': {}}
+            >>> match_fast_path("arm the drone and takeoff to 15 meters") is None
+            True
+        """
+        command = _normalize(processed_input)
+        for pattern, function_name in _FAST_PATHS:
+            match = pattern.fullmatch(command)
+            if match:
+                return {
+                    "function_name": function_name,
+                    "arguments": {k: _convert_value(v) for k, v in match.groupdict().items()}
+                }
+        return None
     
     def preprocess_command(self, user_input: str) -> str:
         """
@@ -40,33 +315,14 @@ class FunctionGemmaInterface:
             >>> preprocess_command("takeoff drone at 15")
             'takeoff to 15 meters'
         """
-        import re
-        
         processed = user_input.lower().strip()
         
-        # Fix takeoff variations - convert to "takeoff to X meters"
-        takeoff_patterns = [
-            # "takeoff 20" → "takeoff to 20 meters"
-            (r'\btakeoff\s+(\d+)\s*(?:meters?|m)?\s*$', r'takeoff to \1 meters'),
-            
-            # "takeoff drone 20" → "takeoff to 20 meters"
-            (r'\btakeoff\s+drone\s+(\d+)\b', r'takeoff to \1 meters'),
-            
-            # "takeoff drone at 20" → "takeoff to 20 meters"
-            (r'\btakeoff\s+drone\s+at\s+(\d+)\b', r'takeoff to \1 meters'),
-            
-            # "takeoff at 20" → "takeoff to 20 meters"
-            (r'\btakeoff\s+at\s+(\d+)\b', r'takeoff to \1 meters'),
-            
-            # "take off 20" → "takeoff to 20 meters"
-            (r'\btake\s+off\s+(\d+)\b', r'takeoff to \1 meters'),
-            
-            # "take off drone 20" → "takeoff to 20 meters"
-            (r'\btake\s+off\s+drone\s+(\d+)\b', r'takeoff to \1 meters'),
-        ]
+        # Only takeoff commands are rewritten; skip the regex for the rest
+        if 'take' not in processed:
+            return processed
         
-        for pattern, replacement in takeoff_patterns:
-            processed = re.sub(pattern, replacement, processed)
+        # Fix takeoff variations - convert to "takeoff to X meters"
+        processed = _TAKEOFF_RE.sub(r'takeoff to \1 meters', processed)
         
         return processed
         
@@ -80,106 +336,226 @@ class FunctionGemmaInterface:
         Returns:
             Dictionary with function_name and arguments, or None if no valid call
         """
-        # Look for <start_function_call>call:function_name{args}<end_function_call>
-        pattern = r'<start_function_call>call:(\w+)\{([^}]*)\}<end_function_call>'
-        match = re.search(pattern, response)
+        match = _CALL_RE.search(response)
         
         if not match:
             return None
             
-        function_name = match.group(1)
-        args_str = match.group(2)
+        return self._parse_call(match)
+    
+    def parse_function_calls(self, response: str) -> List[Dict[str, Any]]:
+        """
+        Parse every function call in a FunctionGemma response
         
-        # Parse arguments
-        arguments = {}
-        if args_str:
-            # Handle escaped strings like mode:<escape>GUIDED<escape>
-            # Replace <escape> tags with quotes for JSON parsing
-            args_str = args_str.replace('<escape>', '"')
+        Args:
+            response: Raw response from model
             
-            # Try to parse as JSON-like format
-            try:
-                # Handle simple key:value pairs
-                pairs = args_str.split(',')
-                for pair in pairs:
-                    if ':' in pair:
-                        key, value = pair.split(':', 1)
-                        key = key.strip()
-                        value = value.strip().strip('"')
-                        
-                        # Try to convert to appropriate type
-                        try:
-                            # Try integer
-                            arguments[key] = int(value)
-                        except ValueError:
-                            try:
-                                # Try float
-                                arguments[key] = float(value)
-                            except ValueError:
-                                # Keep as string
-                                arguments[key] = value
-            except Exception as e:
-                print(f"Warning: Could not parse arguments: {e}")
-                print(f"Raw args: {args_str}")
+        Returns:
+            List of dictionaries with function_name and arguments, in order
+        """
+        return [self._parse_call(match) for match in _CALL_RE.finditer(response)]
+    
+    def _parse_call(self, match: "re.Match") -> Dict[str, Any]:
+        """Build the function call dictionary from a _CALL_RE match"""
+        function_name, args_str = match.groups()
+        
+        # Handle escaped strings like mode:<escape>GUIDED<escape>
+        # Replace <escape> tags with quotes so they parse like quoted strings
+        args_str = args_str.replace('<escape>', '"')
+        
+        # Parse key:value arguments
+        arguments = {}
+        for key, value in _KV_RE.findall(args_str):
+            # Convert to appropriate type: integer, float, else keep as string
+            arguments[key] = _convert_value(value.strip().strip('"'))
         
         return {
             "function_name": function_name,
             "arguments": arguments
         }
     
-    def get_function_call(self, user_input: str) -> Optional[Dict[str, Any]]:
+    def _lookup(self, user_input: str, use_cache: bool) -> tuple:
+        """
+        Preprocess a command and answer it without the model if possible
+        
+        Args:
+            user_input: Natural language command from user
+            use_cache: Look up the result in the command cache
+            
+        Returns:
+            Tuple of (processed_input, cache_key, result). result is None
+            when the command has to go to the model.
+        """
+        # Preprocess the input to fix common variations
+        processed_input = self.preprocess_command(user_input)
+        
+        # Show preprocessing if input was changed
+        if processed_input != user_input.lower().strip():
+            logger.debug("[PREPROCESSED] '%s' -> '%s'", user_input, processed_input)
+        
+        key = self._cache_key(processed_input)
+        
+        # Answer unambiguous commands without the model
+        if self.fast_path:
+            result = self.match_fast_path(processed_input)
+            if result:
+                logger.debug("[FAST] %s(%s)", result['function_name'], result['arguments'])
+                return processed_input, key, result
+        
+        # Answer repeated commands from the cache, then from earlier runs
+        if use_cache and key not in self._cache and self._db is not None:
+            stored = self._db_get(key)
+            if stored:
+                self._remember(key, stored)
+        
+        if use_cache and key in self._cache:
+            self._cache.move_to_end(key)
+            cached = self._cache[key]
+            logger.debug("[CACHED] %s(%s)", cached['function_name'], cached['arguments'])
+            return processed_input, key, {
+                "function_name": cached["function_name"],
+                "arguments": dict(cached["arguments"])
+            }
+        
+        return processed_input, key, None
+    
+    def _chat_kwargs(self, processed_input: str) -> Dict[str, Any]:
+        """Build the Ollama chat request for a preprocessed command"""
+        # No tools parameter - using embedded template
+        return {
+            'model': self.model_name,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': processed_input
+                }
+            ],
+            'options': dict(self.options, num_ctx=self._estimate_ctx(processed_input)),
+            'keep_alive': KEEP_ALIVE
+        }
+    
+    def _finish(self, key: tuple, raw_response: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+        """Parse a model response and store the result in the command cache"""
+        result = self.parse_function_call(raw_response)
+        
+        if result:
+            logger.debug("[PARSED] %s(%s)", result['function_name'], result['arguments'])
+            if use_cache:
+                self._remember(key, result)
+                if self._db is not None:
+                    self._db_put(key, result)
+        else:
+            logger.error("[ERROR] Could not parse function call from: %s", raw_response)
+            
+        return result
+    
+    def _remember(self, key: tuple, result: Dict[str, Any]):
+        """Store a copy of a parsed command in the in-process cache"""
+        self._cache[key] = {
+            "function_name": result["function_name"],
+            "arguments": dict(result["arguments"])
+        }
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def get_function_call(self, user_input: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
         """
         Get function call from user input
         
+        Repeated commands are answered from an in-process cache instead of
+        running the model again.
+        
         Args:
             user_input: Natural language command from user
+            use_cache: Look up and store the result in the command cache
             
         Returns:
             Dictionary with function_name and arguments, or None if parsing failed
         """
         try:
-            # Preprocess the input to fix common variations
-            processed_input = self.preprocess_command(user_input)
-            
-            # Show preprocessing if input was changed
-            if processed_input != user_input.lower().strip():
-                print(f"[PREPROCESSED] '{user_input}' -> '{processed_input}'")
-            
-            # Call model (no tools parameter - using embedded template)
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': processed_input
-                    }
-                ]
-            )
-            
-            # Get response content
-            raw_response = response['message']['content']
+            processed_input, key, result = self._lookup(user_input, use_cache)
+            if result:
+                return result
             
-            # Parse function call
-            result = self.parse_function_call(raw_response)
+            # Call model, streaming so we can stop at the end of the call
+            stream = _client.chat(stream=True, **self._chat_kwargs(processed_input))
             
-            if result:
-                print(f"[PARSED] {result['function_name']}({result['arguments']})")
-            else:
-                print(f"[ERROR] Could not parse function call from: {raw_response}")
-                
-            return result
+            return self._finish(key, self._read_stream(stream), use_cache)
             
         except Exception as e:
-            print(f"[ERROR] Error communicating with model: {e}")
+            logger.error("[ERROR] Error communicating with model: %s", e)
             return None
     
-    def query(self, user_input: str) -> Dict[str, Any]:
+    def _read_stream(self, stream) -> str:
         """
-        Query for backward compatibility with demo.py
-        Returns format: {'type': 'function_calls', 'calls': [{'name': ..., 'arguments': ...}]}
+        Accumulate a streamed chat response up to the first function call
+        
+        Anything the model generates after <end_function_call> is discarded
+        by the parser, so the stream is closed there instead of waiting for
+        the model to finish (closing the connection stops generation).
+        """
+        buf = ''
+        try:
+            for chunk in stream:
+                buf += chunk['message']['content']
+                if END_CALL in buf:
+                    break
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+        return buf
+    
+    def get_function_calls(self, user_inputs: List[str],
+                           use_cache: bool = True) -> List[Optional[Dict[str, Any]]]:
         """
-        result = self.get_function_call(user_input)
+        Get function calls for several commands at once
+        
+        Commands that need the model are sent concurrently, so an Ollama
+        server started with OLLAMA_NUM_PARALLEL=4 (or more) batches them
+        instead of paying the full request overhead one command at a time.
         
+        Args:
+            user_inputs: Natural language commands, in order
+            use_cache: Look up and store the results in the command cache
+            
+        Returns:
+            One result per command (see get_function_call), in the same order
+        """
+        try:
+            return asyncio.run(self._aget_function_calls(user_inputs, use_cache))
+        except Exception as e:
+            logger.error("[ERROR] Error communicating with model: %s", e)
+            return [None] * len(user_inputs)
+    
+    async def _aget_function_calls(self, user_inputs: List[str],
+                                   use_cache: bool) -> List[Optional[Dict[str, Any]]]:
+        """Async implementation of get_function_calls"""
+        lookups = [self._lookup(user_input, use_cache) for user_input in user_inputs]
+        results = [result for _, _, result in lookups]
+        pending = [(i, processed_input, key)
+                   for i, (processed_input, key, result) in enumerate(lookups)
+                   if result is None]
+        
+        # Closed on exit so its connection pool doesn't outlive the event loop
+        async with ollama.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            responses = await asyncio.gather(
+                *(client.chat(**self._chat_kwargs(processed_input)) for _, processed_input, _ in pending),
+                return_exceptions=True
+            )
+        
+        for (i, _, key), response in zip(pending, responses):
+            if isinstance(response, Exception):
+                # httpx timeouts raised in async code carry no message
+                logger.error("[ERROR] Error communicating with model: %s",
+                             str(response) or type(response).__name__)
+                continue
+            results[i] = self._finish(key, response['message']['content'], use_cache)
+        
+        return results
+    
+    def _to_query_response(self, result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert a function call result to the query() response format"""
         if result:
             # Convert to old format with 'name' key
             return {
@@ -195,6 +571,20 @@ class FunctionGemmaInterface:
                 'content': 'Could not understand command'
             }
     
+    def query(self, user_input: str) -> Dict[str, Any]:
+        """
+        Query for backward compatibility with demo.py
+        Returns format: {'type': 'function_calls', 'calls': [{'name': ..., 'arguments': ...}]}
+        """
+        return self._to_query_response(self.get_function_call(user_input))
+    
+    def query_batch(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        """
+        Query several commands at once (see get_function_calls)
+        Returns one query() style response per command, in order
+        """
+        return [self._to_query_response(result) for result in self.get_function_calls(user_inputs)]
+    
     def format_result_message(self, function_name: str, result: Dict[str, Any]) -> str:
         """
         Format function result into a user-friendly message.
@@ -211,35 +601,9 @@ class FunctionGemmaInterface:
         if result.get('status') != 'success':
             return result.get('message', 'Command failed')
         
-        # Special formatting for battery status
-        if function_name == 'get_battery':
-            voltage = result.get('voltage', 0.0)
-            current = result.get('current', 0.0)
-            remaining = result.get('remaining', 0)
-            return f"Battery: {voltage:.2f}V, {current:.2f}A, {remaining}% remaining"
-        
-        # Special formatting for position
-        elif function_name == 'get_position':
-            lat = result.get('latitude', 0.0)
-            lon = result.get('longitude', 0.0)
-            alt = result.get('altitude', 0.0)
-            heading = result.get('heading', 0.0)
-            return f"Position: Lat {lat:.6f}°, Lon {lon:.6f}°, Alt {alt:.1f}m, Heading {heading:.1f}°"
-        
-        # Special formatting for mode
-        elif function_name == 'get_mode':
-            mode = result.get('mode', 'UNKNOWN')
-            return f"Current mode: {mode}"
-        
-        # Special formatting for armable status
-        elif function_name == 'is_armable':
-            armable = result.get('armable', False)
-            reasons = result.get('reasons', [])
-            if armable:
-                return "Drone is ready to arm"
-            else:
-                reason_text = ", ".join(reasons) if reasons else "Unknown reasons"
-                return f"WARNING: Drone not ready to arm: {reason_text}"
+        formatter = _RESULT_FORMATTERS.get(function_name)
+        if formatter:
+            return formatter(result)
         
         # Default: use the message from result
         return result.get('message', 'Command executed successfully')
@@ -258,13 +622,28 @@ class FunctionGemmaInterface:
         """
         return self.format_result_message(function_name, result)
     
+    def clear_cache(self):
+        """Forget all cached command results, including this model's on-disk ones"""
+        self._cache.clear()
+        if self._db is not None:
+            try:
+                with self._db:
+                    self._db.execute("DELETE FROM responses WHERE model = ?", (self.model_name,))
+            except sqlite3.Error as e:
+                logger.warning("[WARN] Cache database clear failed: %s", e)
+    
     def reset_conversation(self):
-        """Reset conversation history"""
+        """
+        Reset conversation history
+        
+        The command cache is kept: a command's parsed call doesn't depend on
+        the conversation. clear_cache() empties it.
+        """
         self.conversation_history = []
 
 
 # For backward compatibility
-def get_function_from_gemma(user_input: str, model_name: str = "ardupilot-stage1") -> Optional[Dict[str, Any]]:
+def get_function_from_gemma(user_input: str, model_name: str = DEFAULT_MODEL) -> Optional[Dict[str, Any]]:
     """
     Legacy function - Get function call from FunctionGemma
     
@@ -0,0 +1,36 @@
+"""
+Shared pytest fixtures
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.function_gemma import FunctionGemmaInterface
+from examples.demo import MockDroneController
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--sitl", action="store_true",
+        help="Run the flight tests against ArduPilot SITL instead of the mock drone"
+    )
+    parser.addoption(
+        "--connection", default="udp:127.0.0.1:14550",
+        help="MAVLink connection string for --sitl (default: udp:127.0.0.1:14550)"
+    )
+
+
+@pytest.fixture(scope="session")
+def gemma():
+    """FunctionGemma interface, shared by all tests (parsing only, no model calls)"""
+    return FunctionGemmaInterface()
+
+
+@pytest.fixture
+def drone():
+    """Fresh mock drone for each test, since tests change its state"""
+    return MockDroneController()
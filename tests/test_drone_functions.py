@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Tests for DroneController against a simulated vehicle
+
+FakeMaster stands in for the pymavlink connection: it answers commands the
+way ArduCopter does (COMMAND_ACK first, then heartbeats showing the new
+state), so the background listener and the command logic run unmodified.
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.drone_functions as drone_functions
+from src.drone_functions import (
+    DroneController, QUEUE_SIZE, MAX_MSG_AGE, FRAME_GLOBAL_REL_ALT, FRAME_LOCAL_NED,
+    CMD_TAKEOFF, CMD_WAYPOINT, CMD_LAND, mavutil,
+)
+
+mavlink = mavutil.mavlink
+
+# ArduCopter flight mode ids
+MODES = {'STABILIZE': 0, 'AUTO': 3, 'GUIDED': 4, 'LOITER': 5, 'RTL': 6, 'LAND': 9}
+
+
+class FakeMaster:
+    """
+    Simulated vehicle behind a pymavlink-style connection
+
+    Messages pushed with push() come out of recv_match() in order. Mode and
+    arm commands are ACKed at once, and the heartbeat showing the new state
+    follows heartbeat_delay seconds later. During a mission upload, each
+    item received (and the count) is answered with the next batch of
+    requests from mission_requests, then with the final MISSION_ACK.
+    """
+
+    target_system = 1
+    target_component = 1
+
+    def __init__(self, mode='STABILIZE', armed=False, heartbeat_delay=0.2):
+        self.mode = mode
+        self.armed = armed
+        self.heartbeat_delay = heartbeat_delay
+        self.sent = []  # (method name, args) of everything sent to the vehicle
+        self.fail_reads = False  # recv_match() raises OSError, as on a dead link
+        self.mission_requests = []  # batches of item seqs to request during an upload
+        self._inbox = []
+        self._cond = threading.Condition()
+        self.mav = self  # master.mav.<message>_send() lands on this object
+        self.push(self.heartbeat())
+        self.push(mavlink.MAVLink_global_position_int_message(
+            0, 285355000, 773910000, 10000, 10000, 0, 0, 0, 9000))
+
+    def heartbeat(self):
+        base_mode = mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+        if self.armed:
+            base_mode |= mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+        return mavlink.MAVLink_heartbeat_message(
+            mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+            base_mode, MODES[self.mode], mavlink.MAV_STATE_ACTIVE, 3)
+
+    def push(self, msg):
+        with self._cond:
+            self._inbox.append(msg)
+            self._cond.notify_all()
+
+    def _ack(self, command, result=mavlink.MAV_RESULT_ACCEPTED):
+        self.push(mavlink.MAVLink_command_ack_message(command, result))
+
+    def _mission_ack(self):
+        self.push(mavlink.MAVLink_mission_ack_message(0, 0, mavlink.MAV_MISSION_ACCEPTED))
+
+    def _request_items(self):
+        if not self.mission_requests:
+            self._mission_ack()
+            return
+        for seq in self.mission_requests.pop(0):
+            # Odd seqs use MISSION_REQUEST_INT, even ones MISSION_REQUEST
+            request = (mavlink.MAVLink_mission_request_int_message if seq % 2
+                       else mavlink.MAVLink_mission_request_message)
+            self.push(request(0, 0, seq))
+
+    def _heartbeat_later(self):
+        timer = threading.Timer(self.heartbeat_delay, lambda: self.push(self.heartbeat()))
+        timer.daemon = True
+        timer.start()
+
+    # pymavlink connection API
+
+    def recv_match(self, type=None, blocking=False, timeout=None):
+        if self.fail_reads:
+            raise OSError("link down")
+        types = [type] if isinstance(type, str) else type
+        deadline = time.monotonic() + (timeout or 0)
+        with self._cond:
+            while True:
+                for i, msg in enumerate(self._inbox):
+                    if types is None or msg.get_type() in types:
+                        return self._inbox.pop(i)
+                remaining = deadline - time.monotonic()
+                if not blocking or remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def wait_heartbeat(self):
+        pass
+
+    def mode_mapping(self):
+        return dict(MODES)
+
+    def close(self):
+        self.sent.append(('close', ()))
+
+    # master.mav senders
+
+    def request_data_stream_send(self, *args):
+        self.sent.append(('request_data_stream', args))
+
+    def mission_item_send(self, *args):
+        self.sent.append(('mission_item', args))
+
+    def mission_clear_all_send(self, *args):
+        self.sent.append(('mission_clear_all', args))
+        self._mission_ack()
+
+    def mission_count_send(self, *args):
+        self.sent.append(('mission_count', args))
+        self._request_items()
+
+    def mission_item_int_send(self, *args):
+        self.sent.append(('mission_item_int', args))
+        self._request_items()
+
+    def command_long_send(self, target_system, target_component, command, confirmation, *params):
+        self.sent.append(('command_long', (command,) + params))
+        if command == mavlink.MAV_CMD_DO_SET_MODE:
+            self.mode = next(name for name, mode_id in MODES.items() if mode_id == params[1])
+            self._ack(command)
+            self._heartbeat_later()
+        elif command == mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
+            self.armed = params[0] == 1
+            self._ack(command)
+            self._heartbeat_later()
+        elif command == mavlink.MAV_CMD_NAV_TAKEOFF:
+            ok = self.armed and self.mode == 'GUIDED'
+            self._ack(command, mavlink.MAV_RESULT_ACCEPTED if ok else mavlink.MAV_RESULT_FAILED)
+        else:
+            self._ack(command)
+
+
+@pytest.fixture
+def vehicle():
+    return FakeMaster(armed=True)
+
+
+@pytest.fixture
+def controller(vehicle, monkeypatch):
+    """DroneController connected to the simulated vehicle, listener running"""
+    monkeypatch.setattr(mavutil, 'mavlink_connection', lambda connection_string, **kwargs: vehicle)
+    drone = DroneController()
+    assert drone.connect()
+    yield drone
+    drone.disconnect()
+
+
+def wait_until_read(controller, vehicle):
+    """Block until the listener has handled everything pushed so far"""
+    marker = mavlink.MAVLink_system_time_message(0, 12345)
+    vehicle.push(marker)
+    with controller._rx_cond:
+        assert controller._rx_cond.wait_for(
+            lambda: controller._fresh('SYSTEM_TIME') is marker, 2.0)
+
+
+def test_takeoff_right_after_mode_change(controller, vehicle):
+    """takeoff sees the mode set just before, not the heartbeat cached before it"""
+    assert controller.change_mode("GUIDED")["status"] == "success"
+
+    result = controller.takeoff(15)
+
+    assert result["status"] == "success", result
+    assert vehicle.mode == "GUIDED"
+
+
+def test_goto_right_after_mode_change(controller, vehicle):
+    """goto_location switches back to GUIDED right after another mode change"""
+    assert controller.change_mode("LOITER")["status"] == "success"
+
+    result = controller.goto_location(28.5, 77.0, 20)
+
+    assert result["status"] == "success", result
+    assert vehicle.mode == "GUIDED"
+
+
+def test_armed_state_after_disarm_command(controller, vehicle):
+    """A heartbeat cached before an ACKed disarm doesn't count as current"""
+    assert controller._check_armed_state()
+
+    vehicle.command_long_send(1, 1, mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0, 0, 0, 0, 0, 0, 0, 0)
+    assert controller._wait_ack(mavlink.MAV_CMD_COMPONENT_ARM_DISARM).result == 0
+
+    assert not controller._check_armed_state()
+
+
+def test_arm_and_disarm(controller):
+    """The armed state read right after disarm/arm shows the new state"""
+    assert controller.disarm()["status"] == "success"
+    assert not controller._check_armed_state()
+
+    assert controller.arm()["status"] == "success"
+    assert controller._check_armed_state()
+
+
+def test_wait_ack_skips_other_commands(controller, vehicle):
+    """ACKs queue in arrival order; _wait_ack discards ones for other commands"""
+    vehicle.push(mavlink.MAVLink_command_ack_message(mavlink.MAV_CMD_NAV_TAKEOFF, 0))
+    vehicle.push(mavlink.MAVLink_command_ack_message(mavlink.MAV_CMD_NAV_LAND, 4))
+
+    ack = controller._wait_ack(mavlink.MAV_CMD_NAV_LAND, timeout=1.0)
+
+    assert ack.command == mavlink.MAV_CMD_NAV_LAND and ack.result == 4
+    assert controller._queues['COMMAND_ACK'].empty()
+
+
+def test_fresh_ignores_old_telemetry(controller, vehicle):
+    """Cached telemetry older than MAX_MSG_AGE reads as missing"""
+    wait_until_read(controller, vehicle)
+    with controller._rx_cond:
+        received_at, msg = controller._latest['GLOBAL_POSITION_INT']
+        assert controller._fresh('GLOBAL_POSITION_INT') is msg
+
+        controller._latest['GLOBAL_POSITION_INT'] = (received_at - MAX_MSG_AGE, msg)
+
+        assert controller._fresh('GLOBAL_POSITION_INT') is None
+
+
+def test_full_queue_drops_oldest(controller, vehicle):
+    """A queue nobody reads keeps only the newest QUEUE_SIZE messages"""
+    for command in range(QUEUE_SIZE + 5):
+        vehicle.push(mavlink.MAVLink_command_ack_message(command, 0))
+    wait_until_read(controller, vehicle)
+
+    q = controller._queues['COMMAND_ACK']
+    commands = [q.get_nowait().command for _ in range(q.qsize())]
+
+    assert commands == list(range(5, QUEUE_SIZE + 5))
+
+
+def test_listener_stops_after_repeated_errors(controller, vehicle, monkeypatch):
+    """A dead link stops the listener and commands read the connection directly"""
+    monkeypatch.setattr(drone_functions, 'RX_ERROR_BACKOFF', 0.01)
+    thread = controller._rx_thread
+
+    vehicle.fail_reads = True
+    thread.join(timeout=2.0)
+
+    assert not thread.is_alive()
+    assert controller._rx_thread is None
+    with pytest.raises(OSError):
+        controller._recv('HEARTBEAT', 0.1)
+
+
+def test_disconnect_stops_listener(controller, vehicle):
+    """disconnect() ends the listener thread and closes the connection"""
+    thread = controller._rx_thread
+
+    controller.disconnect()
+
+    assert not thread.is_alive()
+    assert ('close', ()) in vehicle.sent
+    assert controller.master is None and controller._rx_thread is None
+
+
+@pytest.mark.parametrize("listener", [True, False], ids=["listener", "direct"])
+def test_upload_mission_sends_requested_items(controller, vehicle, listener):
+    """Each item goes out by the seq requested, with x/y in MISSION_ITEM_INT units"""
+    if not listener:
+        controller.disconnect()
+        controller.master = vehicle
+    controller.create_mission()
+    controller.add_takeoff_waypoint(10)
+    controller.add_waypoint(28.5355123, 77.3910456, 30)
+    controller.add_relative_waypoint(12.3456, -7.5, 20)
+    controller.add_land_waypoint()
+    # Out of order, a repeated request, and a retransmit burst
+    vehicle.mission_requests = [[1], [0, 0], [1], [3, 2], [3]]
+
+    result = controller.upload_mission()
+
+    assert result["status"] == "success", result
+    # seq -> (frame, command, x, y, z)
+    expected = {
+        0: (FRAME_GLOBAL_REL_ALT, CMD_TAKEOFF, 0, 0, 10),
+        1: (FRAME_GLOBAL_REL_ALT, CMD_WAYPOINT, 285355123, 773910456, 30),
+        2: (FRAME_LOCAL_NED, CMD_WAYPOINT, 123456, -75000, -20),
+        3: (FRAME_GLOBAL_REL_ALT, CMD_LAND, 0, 0, 0),
+    }
+    items = [args for name, args in vehicle.sent if name == 'mission_item_int']
+    for item in items:
+        seq, frame, command = item[2:5]
+        assert (frame, command) + item[11:14] == expected[seq], item
+    assert {item[2] for item in items} == set(expected)
+    assert items[0][2] == 1 and items[-1][2] == 3
+
+
+def test_get_mode_right_after_mode_change(controller):
+    """get_mode reports the mode just set, not the heartbeat cached before it"""
+    for mode, command in [("LOITER", lambda: controller.change_mode("LOITER")),
+                          ("GUIDED", lambda: controller.change_mode("GUIDED")),
+                          ("RTL", controller.rtl),
+                          ("LAND", controller.land)]:
+        assert command()["status"] == "success"
+
+        assert controller.get_mode()["mode"] == mode
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Tests for FunctionGemmaInterface model calls and its command cache
+
+The Ollama clients are replaced with stubs answering from a table of
+replies, so no model or server is needed.
+"""
+
+import sys
+import os
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.function_gemma as function_gemma
+from src.function_gemma import FunctionGemmaInterface
+
+# Not a fast-path command, so only the cache can answer it without the model
+COMMAND = "fly up to fifteen meters"
+RESPONSE = "<start_function_call>call:takeoff{altitude:15}<end_function_call>"
+RESULT = {"function_name": "takeoff", "arguments": {"altitude": 15}}
+# Two more commands only the model can answer, with their replies
+RTL_COMMAND = "head back to where we started"
+RTL_RESPONSE = "<start_function_call>call:rtl{}<end_function_call>"
+LOITER_COMMAND = "hover over the field for a bit"
+LOITER_RESPONSE = "<start_function_call>call:change_mode{mode:\"LOITER\"}<end_function_call>"
+
+
+class StubClient:
+    """ollama.Client stand-in streaming the same reply chunks for every chat()"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []  # commands sent to chat(), in call order
+        self.streamed = 0  # chunks handed out by the last stream
+        self.closed = False  # the last stream was closed
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        assert stream
+        self.calls.append(messages[-1]['content'])
+        self.streamed = 0
+        self.closed = False
+        return self._stream()
+
+    def _stream(self):
+        try:
+            for chunk in self.chunks:
+                self.streamed += 1
+                yield {'message': {'content': chunk}}
+        finally:
+            self.closed = True
+
+
+def stub_client(monkeypatch, chunks):
+    client = StubClient(chunks)
+    monkeypatch.setattr(function_gemma, '_client', client)
+    return client
+
+
+class StubAsyncClient:
+    """
+    ollama.AsyncClient stand-in
+
+    replies maps a (preprocessed) command to the model's text, or to an
+    exception to raise; delays optionally hold a reply back (seconds).
+    """
+
+    def __init__(self, replies, delays=None):
+        self.replies = replies
+        self.delays = delays or {}
+        self.calls = []  # commands sent to chat(), in call order
+
+    def __call__(self, **kwargs):
+        # Stands in for the class: AsyncClient(timeout=...) returns this stub
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def chat(self, model, messages, **kwargs):
+        command = messages[-1]['content']
+        self.calls.append(command)
+        await asyncio.sleep(self.delays.get(command, 0))
+        reply = self.replies[command]
+        if isinstance(reply, Exception):
+            raise reply
+        return {'message': {'content': reply}}
+
+
+def stub_async_client(monkeypatch, replies, delays=None):
+    client = StubAsyncClient(replies, delays)
+    monkeypatch.setattr(function_gemma.ollama, 'AsyncClient', client)
+    return client
+
+
+def cache_command(gemma):
+    """Store COMMAND's parsed result as if the model had just answered it"""
+    processed_input, key, result = gemma._lookup(COMMAND, use_cache=True)
+    assert result is None
+    assert gemma._finish(key, RESPONSE, use_cache=True) == RESULT
+
+
+def cached_result(gemma):
+    """Result for COMMAND answered without the model, or None"""
+    return gemma._lookup(COMMAND, use_cache=True)[2]
+
+
+def stored_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+@pytest.fixture
+def cache_db(tmp_path):
+    return str(tmp_path / "cache" / "responses.db")
+
+
+def test_cache_survives_restart(cache_db):
+    """A command parsed by one instance is answered from disk by the next"""
+    cache_command(FunctionGemmaInterface(cache_db=cache_db))
+
+    assert cached_result(FunctionGemmaInterface(cache_db=cache_db)) == RESULT
+
+
+def test_cache_is_per_model(cache_db):
+    """Another model's stored commands aren't reused"""
+    cache_command(FunctionGemmaInterface(cache_db=cache_db))
+
+    assert cached_result(FunctionGemmaInterface("other-model", cache_db=cache_db)) is None
+
+
+def test_clear_cache_deletes_rows(cache_db):
+    gemma = FunctionGemmaInterface(cache_db=cache_db)
+    cache_command(gemma)
+    assert stored_rows(cache_db) == 1
+
+    gemma.clear_cache()
+
+    assert stored_rows(cache_db) == 0
+    assert cached_result(gemma) is None
+    assert cached_result(FunctionGemmaInterface(cache_db=cache_db)) is None
+
+
+def test_reset_conversation_keeps_disk_cache(cache_db):
+    """/reset leaves stored commands on disk"""
+    gemma = FunctionGemmaInterface(cache_db=cache_db)
+    cache_command(gemma)
+
+    gemma.reset_conversation()
+
+    assert stored_rows(cache_db) == 1
+
+
+@pytest.mark.parametrize("bad_path", ["corrupt", "unwritable"])
+def test_unusable_cache_db_falls_back_to_memory(tmp_path, caplog, bad_path):
+    """A database that can't be opened logs a warning and caching stays in memory"""
+    if bad_path == "corrupt":
+        path = tmp_path / "responses.db"
+        path.write_bytes(b"not a sqlite database" * 100)
+    else:
+        # Its parent directory would have to be created where a file is
+        (tmp_path / "cache").write_text("")
+        path = tmp_path / "cache" / "responses.db"
+
+    gemma = FunctionGemmaInterface(cache_db=str(path))
+
+    assert gemma._db is None
+    assert "Could not open cache database" in caplog.text
+    cache_command(gemma)
+    assert cached_result(gemma) == RESULT
+
+
+
+def test_batch_logs_empty_timeout_by_type(monkeypatch, caplog):
+    """A timeout with no message is logged by its exception type"""
+    stub_async_client(monkeypatch, {COMMAND: httpx.ReadTimeout('')})
+
+    results = FunctionGemmaInterface().get_function_calls([COMMAND], use_cache=False)
+
+    assert results == [None]
+    assert "Error communicating with model: ReadTimeout" in caplog.text
+
+
+
+@pytest.mark.parametrize(("chunks", "read"), [
+    (["<start_function_call>call:takeoff", "{altitude:15}", "<end_function_call>",
+      "<start_function_call>call:land{}", "<end_function_call>", " and more text"], 3),
+    # End marker split across chunks
+    (["<start_function_call>call:takeoff{altitude:15}<end_func", "tion_call>", "<start"], 2),
+])
+def test_stream_stops_at_end_of_call(monkeypatch, chunks, read):
+    """Streaming stops at the first <end_function_call> and closes the stream"""
+    client = stub_client(monkeypatch, chunks)
+
+    result = FunctionGemmaInterface().get_function_call(COMMAND, use_cache=False)
+
+    assert result == RESULT
+    assert client.streamed == read
+    assert client.closed
+
+
+
+def test_batch_results_in_input_order(monkeypatch):
+    """Replies are matched to their commands whatever order they finish in"""
+    client = stub_async_client(
+        monkeypatch,
+        {COMMAND: RESPONSE, RTL_COMMAND: RTL_RESPONSE, LOITER_COMMAND: LOITER_RESPONSE},
+        delays={COMMAND: 0.05, RTL_COMMAND: 0.02},
+    )
+
+    results = FunctionGemmaInterface().get_function_calls(
+        [COMMAND, "arm the drone", RTL_COMMAND, LOITER_COMMAND], use_cache=False)
+
+    assert results == [
+        RESULT,
+        {"function_name": "arm", "arguments": {}},
+        {"function_name": "rtl", "arguments": {}},
+        {"function_name": "change_mode", "arguments": {"mode": "LOITER"}},
+    ]
+    # The fast-path command never reaches the model
+    assert sorted(client.calls) == sorted([COMMAND, RTL_COMMAND, LOITER_COMMAND])
+
+
+def test_batch_failure_keeps_other_results(monkeypatch, caplog):
+    """A command whose request fails gets an error entry; the others still answer"""
+    stub_async_client(monkeypatch, {
+        COMMAND: RESPONSE,
+        RTL_COMMAND: ConnectionError("model server went away"),
+        LOITER_COMMAND: LOITER_RESPONSE,
+    })
+
+    responses = FunctionGemmaInterface().query_batch([COMMAND, RTL_COMMAND, LOITER_COMMAND])
+
+    assert [r["type"] for r in responses] == ["function_calls", "text", "function_calls"]
+    assert responses[0]["calls"] == [{"name": "takeoff", "arguments": {"altitude": 15}}]
+    assert responses[1]["content"] == "Could not understand command"
+    assert responses[2]["calls"] == [{"name": "change_mode", "arguments": {"mode": "LOITER"}}]
+    assert "model server went away" in caplog.text
+
+
+
+def test_cache_hit_skips_model(monkeypatch):
+    """A repeated command is answered from the cache without calling the model"""
+    client = stub_client(monkeypatch, [RESPONSE])
+    gemma = FunctionGemmaInterface()
+
+    assert gemma.get_function_call(COMMAND) == RESULT
+    assert gemma.get_function_call(COMMAND) == RESULT
+
+    assert client.calls == [COMMAND]
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    """Past CACHE_SIZE entries, the command used longest ago is dropped"""
+    monkeypatch.setattr(function_gemma, 'CACHE_SIZE', 2)
+    client = stub_client(monkeypatch, [RESPONSE])
+    gemma = FunctionGemmaInterface()
+
+    gemma.get_function_call(COMMAND)
+    gemma.get_function_call(RTL_COMMAND)
+    gemma.get_function_call(COMMAND)  # hit; RTL_COMMAND is now the oldest
+    gemma.get_function_call(LOITER_COMMAND)
+
+    assert client.calls == [COMMAND, RTL_COMMAND, LOITER_COMMAND]
+    assert cached_result(gemma) == RESULT
+    assert gemma._lookup(RTL_COMMAND, use_cache=True)[2] is None
+
+
+def test_reset_conversation_keeps_cache(monkeypatch):
+    """reset_conversation clears the history but still answers from the cache"""
+    client = stub_client(monkeypatch, [RESPONSE])
+    gemma = FunctionGemmaInterface()
+    gemma.get_function_call(COMMAND)
+    gemma.conversation_history.append({"role": "user", "content": COMMAND})
+
+    gemma.reset_conversation()
+
+    assert gemma.conversation_history == []
+    assert gemma.get_function_call(COMMAND) == RESULT
+    assert client.calls == [COMMAND]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))
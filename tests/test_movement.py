@@ -1,126 +1,79 @@
 #!/usr/bin/env python3
 """
-Test movement functionality for ArduPilot SITL
+Test movement functionality
 
-Tests arm, takeoff, and directional movement commands.
+Tests arm, takeoff, and directional movement commands. By default they run
+against the demo mock drone; pass --sitl (and optionally --connection) to
+fly ArduPilot SITL instead. Running this file as a script uses SITL.
 """
-from drone_functions import DroneController
+import sys
+import os
 import time
 
-def main():
-    print("=" * 50)
-    print("ArduPilot Movement Test Script")
-    print("=" * 50)
+import pytest
 
-    drone = DroneController('udp:127.0.0.1:14550')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    print("\nConnecting to SITL...")
-    if not drone.connect():
-        print("Connection failed")
-        return
-    print("Connected")
+from src.drone_functions import DroneController
+from examples.demo import MockDroneController
 
-    # Test 1: Get position
-    print("\n--- Test 1: Get current position ---")
-    result = drone.get_position()
-    print(f"Result: {result}")
+TAKEOFF_ALT = 10
 
-    # Test 1b: Switch to GUIDED mode (required for arming in SITL)
-    print("\n--- Test 1b: Switch to GUIDED mode ---")
-    result = drone.change_mode("GUIDED")
-    print(f"Result: {result}")
+# Seconds to wait for the takeoff to reach TAKEOFF_ALT
+TAKEOFF_TIMEOUT = 20
 
-    # Test 2: Arm
-    print("\n--- Test 2: Arm the drone ---")
-    result = drone.arm()
-    print(f"Result: {result}")
-    if result.get("status") != "success":
-        print("Arming failed, cannot continue")
-        return
-
-    # Test 3: Takeoff
-    print("\n--- Test 3: Takeoff to 10m ---")
-    result = drone.takeoff(10)
-    print(f"Result: {result}")
-    if result.get("status") != "success":
-        print("Takeoff failed")
-        drone.disarm()
-        return
-
-    # Wait for takeoff
-    print("\nWaiting 8 seconds for takeoff to complete...")
-    time.sleep(8)
-
-    # Test 4: Get position after takeoff
-    print("\n--- Test 4: Get position after takeoff ---")
-    result = drone.get_position()
-    print(f"Result: {result}")
-    alt = result.get("altitude", 0)
-    print(f"Current altitude: {alt}m")
-
-    # Test 5: Move west
-    print("\n--- Test 5: Move west 5 meters ---")
-    result = drone.move_west(5)
-    print(f"Result: {result}")
-
-    if result.get("status") == "success":
-        print("MOVE WEST WORKS!")
-        time.sleep(3)
-    else:
-        print(f"Move west failed: {result.get('message')}")
-
-    # Test 6: Move east
-    print("\n--- Test 6: Move east 5 meters ---")
-    result = drone.move_east(5)
-    print(f"Result: {result}")
 
-    if result.get("status") == "success":
-        print("MOVE EAST WORKS!")
-        time.sleep(3)
-    else:
-        print(f"Move east failed: {result.get('message')}")
+def _wait_for_altitude(drone, target, timeout=TAKEOFF_TIMEOUT):
+    """Poll the altitude until it is within 5% of target, or timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if drone.get_position().get("altitude", 0) >= target * 0.95:
+            return True
+        time.sleep(0.2)
+    return False
 
-    # Test 7: Move north
-    print("\n--- Test 7: Move north 5 meters ---")
-    result = drone.move_north(5)
-    print(f"Result: {result}")
 
-    if result.get("status") == "success":
-        print("MOVE NORTH WORKS!")
-        time.sleep(3)
+@pytest.fixture(scope="module")
+def flying_drone(request):
+    """Drone armed and hovering at TAKEOFF_ALT; lands after the module's tests"""
+    if request.config.getoption("--sitl"):
+        drone = DroneController(request.config.getoption("--connection"))
+        if not drone.connect():
+            pytest.fail("Connection to SITL failed")
+        # GUIDED is required for arming in SITL
+        drone.change_mode("GUIDED")
     else:
-        print(f"Move north failed: {result.get('message')}")
-
-    # Test 8: Move south
-    print("\n--- Test 8: Move south 5 meters ---")
-    result = drone.move_south(5)
-    print(f"Result: {result}")
+        drone = MockDroneController()
+    
+    result = drone.arm()
+    assert result.get("status") == "success", f"Arming failed: {result}"
+    
+    result = drone.takeoff(TAKEOFF_ALT)
+    if result.get("status") != "success":
+        drone.disarm()
+        pytest.fail(f"Takeoff failed: {result}")
+    
+    assert _wait_for_altitude(drone, TAKEOFF_ALT), f"Did not reach {TAKEOFF_ALT}m"
+    
+    yield drone
+    
+    drone.land()
 
-    if result.get("status") == "success":
-        print("MOVE SOUTH WORKS!")
-        time.sleep(3)
-    else:
-        print(f"Move south failed: {result.get('message')}")
 
-    # Test 9: Increase altitude
-    print("\n--- Test 9: Increase altitude by 5m ---")
-    result = drone.increase_altitude(5)
-    print(f"Result: {result}")
+@pytest.mark.parametrize("direction", ["west", "east", "north", "south"])
+def test_move(flying_drone, direction):
+    """Move 5 meters in each direction"""
+    result = getattr(flying_drone, f"move_{direction}")(5)
+    
+    assert result.get("status") == "success", f"Move {direction} failed: {result.get('message')}"
 
-    if result.get("status") == "success":
-        print("INCREASE ALTITUDE WORKS!")
-        time.sleep(3)
-    else:
-        print(f"Increase altitude failed: {result.get('message')}")
 
-    # Test 10: Land
-    print("\n--- Test 10: Land ---")
-    result = drone.land()
-    print(f"Result: {result}")
+def test_increase_altitude(flying_drone):
+    """Climb 5 meters"""
+    result = flying_drone.increase_altitude(5)
+    
+    assert result.get("status") == "success", f"Increase altitude failed: {result.get('message')}"
 
-    print("\n" + "=" * 50)
-    print("Movement Test Complete")
-    print("=" * 50)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(pytest.main([__file__, "--sitl"] + sys.argv[1:]))
@@ -1,46 +1,56 @@
 #!/usr/bin/env python3
 """Test script to verify setup"""
 import sys
+import os
+
+import pytest
 from rich.console import Console
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.function_gemma import DEFAULT_MODEL
+
 console = Console()
 
 def test_ollama():
     console.print("\n[bold cyan]Testing Ollama...[/bold cyan]")
+    import ollama
+    console.print("[green]   [PASS] Ollama package installed[/green]")
     try:
-        import ollama
-        console.print("[green]   [PASS] Ollama package installed[/green]")
         models = ollama.list()
-        console.print("[green]   [PASS] Ollama running[/green]")
-        model_names = [m['name'] for m in models.get('models', [])]
-        if any('functiongemma' in n for n in model_names):
-            console.print("[green]   [PASS] FunctionGemma found[/green]")
-            return True
-        else:
-            console.print("[yellow]   [WARN]  FunctionGemma not found[/yellow]")
-            return False
     except Exception as e:
-        console.print(f"[red]   [FAIL] Failed: {e}[/red]")
-        return False
+        console.print(f"[yellow]   [WARN]  Ollama not running: {e}[/yellow]")
+        pytest.skip(f"Ollama not running: {e}")
+    console.print("[green]   [PASS] Ollama running[/green]")
+    model_names = [m.model for m in models.models]
+    found = any(n.split(':')[0] == DEFAULT_MODEL.split(':')[0] for n in model_names)
+    if found:
+        console.print(f"[green]   [PASS] {DEFAULT_MODEL} found[/green]")
+    else:
+        console.print(f"[yellow]   [WARN]  {DEFAULT_MODEL} not found[/yellow]")
+    assert found, f"{DEFAULT_MODEL} not found (see models/SETUP.md)"
 
 def test_pymavlink():
     console.print("\n[bold cyan]Testing PyMAVLink...[/bold cyan]")
-    try:
-        import pymavlink
-        console.print(f"[green]   [PASS] PyMAVLink installed[/green]")
-        return True
-    except:
-        console.print("[red]   [FAIL] PyMAVLink not installed[/red]")
-        return False
+    import pymavlink
+    console.print(f"[green]   [PASS] PyMAVLink installed[/green]")
 
 def test_rich():
     console.print("\n[bold cyan]Testing Rich...[/bold cyan]")
     console.print("[green]   [PASS] Rich installed[/green]")
-    return True
 
 def main():
     console.print("[bold yellow]System Check[/bold yellow]\n")
-    results = [test_ollama(), test_pymavlink(), test_rich()]
+    results = []
+    for check in (test_ollama, test_pymavlink, test_rich):
+        try:
+            check()
+            results.append(True)
+        except pytest.skip.Exception:
+            results.append(False)
+        except Exception as e:
+            console.print(f"[red]   [FAIL] Failed: {e}[/red]")
+            results.append(False)
     if all(results):
         console.print("\n[bold green][PASS] All tests passed![/bold green]")
         return 0
@@ -2,315 +2,183 @@
 """
 Comprehensive test suite for ArduPilot AI Assistant
 Tests all 8 Stage 1 functions in demo mode
+
+Run with pytest (python -m pytest tests/), or directly as a script.
 """
 
 import sys
 import os
+import inspect
+
+import pytest
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.function_gemma import FunctionGemmaInterface
-from examples.demo import MockDroneController
-
-
-class TestSuite:
-    """Comprehensive test suite for Stage 1 functions"""
-    
-    def __init__(self):
-        self.gemma = FunctionGemmaInterface()
-        self.drone = MockDroneController()
-        self.passed = 0
-        self.failed = 0
-        self.tests = []
-    
-    def test_function_parsing(self):
-        """Test that FunctionGemma correctly parses function calls"""
-        print("\n" + "="*60)
-        print("TEST: Function Call Parsing")
-        print("="*60)
-        
-        test_cases = [
-            {
-                "input": "<start_function_call>call:arm{}<end_function_call>",
-                "expected_name": "arm",
-                "expected_args": {}
-            },
-            {
-                "input": "<start_function_call>call:takeoff{altitude:15}<end_function_call>",
-                "expected_name": "takeoff",
-                "expected_args": {"altitude": 15}
-            },
-            {
-                "input": "<start_function_call>call:change_mode{mode:\"GUIDED\"}<end_function_call>",
-                "expected_name": "change_mode",
-                "expected_args": {"mode": "GUIDED"}
-            }
-        ]
-        
-        for i, test in enumerate(test_cases, 1):
-            result = self.gemma.parse_function_call(test["input"])
-            
-            if result and result["function_name"] == test["expected_name"]:
-                print(f"[PASS] Test {i}: Parsed '{test['expected_name']}' correctly")
-                self.passed += 1
-            else:
-                print(f"[FAIL] Test {i}: Failed to parse '{test['expected_name']}'")
-                self.failed += 1
-    
-    def test_arm_function(self):
-        """Test arm function"""
-        print("\n" + "="*60)
-        print("TEST: arm() Function")
-        print("="*60)
-        
-        result = self.drone.arm()
-        
-        if result.get("status") == "success":
-            print(f"[PASS] arm() executed successfully")
-            print(f"   Message: {result.get('message')}")
-            self.passed += 1
-        else:
-            print(f"[FAIL] arm() failed: {result.get('message')}")
-            self.failed += 1
-    
-    def test_disarm_function(self):
-        """Test disarm function"""
-        print("\n" + "="*60)
-        print("TEST: disarm() Function")
-        print("="*60)
-        
-        result = self.drone.disarm()
-        
-        if result.get("status") == "success":
-            print(f"[PASS] disarm() executed successfully")
-            print(f"   Message: {result.get('message')}")
-            self.passed += 1
-        else:
-            print(f"[FAIL] disarm() failed: {result.get('message')}")
-            self.failed += 1
-    
-    def test_takeoff_function(self):
-        """Test takeoff function"""
-        print("\n" + "="*60)
-        print("TEST: takeoff(altitude) Function")
-        print("="*60)
-        
-        # First arm the drone
-        self.drone.arm()
-        
-        # Test takeoff
-        result = self.drone.takeoff(15)
-        
-        if result.get("status") == "success" and result.get("altitude") == 15:
-            print(f"[PASS] takeoff(15) executed successfully")
-            print(f"   Message: {result.get('message')}")
-            self.passed += 1
-        else:
-            print(f"[FAIL] takeoff(15) failed: {result.get('message')}")
-            self.failed += 1
-        
-        # Test takeoff without arming
-        self.drone.disarm()
-        result = self.drone.takeoff(10)
-        
-        if result.get("status") == "error":
-            print(f"[PASS] takeoff() correctly fails when not armed")
-            self.passed += 1
-        else:
-            print(f"[FAIL] takeoff() should fail when not armed")
-            self.failed += 1
-    
-    def test_land_function(self):
-        """Test land function"""
-        print("\n" + "="*60)
-        print("TEST: land() Function")
-        print("="*60)
-        
-        result = self.drone.land()
-        
-        if result.get("status") == "success":
-            print(f"[PASS] land() executed successfully")
-            print(f"   Message: {result.get('message')}")
-            self.passed += 1
-        else:
-            print(f"[FAIL] land() failed: {result.get('message')}")
-            self.failed += 1
-    
-    def test_rtl_function(self):
-        """Test RTL function"""
-        print("\n" + "="*60)
-        print("TEST: rtl() Function")
-        print("="*60)
-        
-        result = self.drone.rtl()
-        
-        if result.get("status") == "success":
-            print(f"[PASS] rtl() executed successfully")
-            print(f"   Message: {result.get('message')}")
-            self.passed += 1
-        else:
-            print(f"[FAIL] rtl() failed: {result.get('message')}")
-            self.failed += 1
-    
-    def test_change_mode_function(self):
-        """Test change_mode function"""
-        print("\n" + "="*60)
-        print("TEST: change_mode(mode) Function")
-        print("="*60)
-        
-        test_modes = ["GUIDED", "LOITER", "RTL", "LAND"]
-        
-        for mode in test_modes:
-            result = self.drone.change_mode(mode)
-            
-            if result.get("status") == "success":
-                print(f"[PASS] change_mode('{mode}') executed successfully")
-                self.passed += 1
-            else:
-                print(f"[FAIL] change_mode('{mode}') failed")
-                self.failed += 1
-    
-    def test_get_battery_function(self):
-        """Test get_battery function"""
-        print("\n" + "="*60)
-        print("TEST: get_battery() Function")
-        print("="*60)
-        
-        result = self.drone.get_battery()
-        
-        if (result.get("status") == "success" and 
-            "voltage" in result and 
-            "current" in result and 
-            "remaining" in result):
-            print(f"[PASS] get_battery() executed successfully")
-            print(f"   Voltage: {result['voltage']}V")
-            print(f"   Current: {result['current']}A")
-            print(f"   Remaining: {result['remaining']}%")
-            
-            # Test formatting
-            formatted = self.gemma.format_result_message("get_battery", result)
-            print(f"   Formatted: {formatted}")
-            
-            if "Battery:" in formatted and str(result['voltage']) in formatted:
-                print(f"[PASS] Battery formatting correct")
-                self.passed += 2  # +1 for function, +1 for formatting
-            else:
-                print(f"[FAIL] Battery formatting incorrect")
-                self.passed += 1
-                self.failed += 1
-        else:
-            print(f"[FAIL] get_battery() failed or missing data")
-            self.failed += 1
-    
-    def test_get_position_function(self):
-        """Test get_position function"""
-        print("\n" + "="*60)
-        print("TEST: get_position() Function")
-        print("="*60)
-        
-        result = self.drone.get_position()
-        
-        if (result.get("status") == "success" and 
-            "latitude" in result and 
-            "longitude" in result and 
-            "altitude" in result):
-            print(f"[PASS] get_position() executed successfully")
-            print(f"   Latitude: {result['latitude']}°")
-            print(f"   Longitude: {result['longitude']}°")
-            print(f"   Altitude: {result['altitude']}m")
-            print(f"   Heading: {result.get('heading', 0)}°")
-            
-            # Test formatting
-            formatted = self.gemma.format_result_message("get_position", result)
-            print(f"   Formatted: {formatted}")
-            
-            if "Position:" in formatted and str(result['latitude']) in formatted:
-                print(f"[PASS] Position formatting correct")
-                self.passed += 2  # +1 for function, +1 for formatting
-            else:
-                print(f"[FAIL] Position formatting incorrect")
-                self.passed += 1
-                self.failed += 1
-        else:
-            print(f"[FAIL] get_position() failed or missing data")
-            self.failed += 1
-    
-    def test_result_formatting(self):
-        """Test result message formatting for all function types"""
-        print("\n" + "="*60)
-        print("TEST: Result Message Formatting")
-        print("="*60)
-        
-        test_cases = [
-            {
-                "function": "arm",
-                "result": {"status": "success", "message": "Drone armed"},
-                "should_contain": "Drone armed"
-            },
-            {
-                "function": "get_mode",
-                "result": {"status": "success", "mode": "GUIDED"},
-                "should_contain": "GUIDED"
-            },
-            {
-                "function": "is_armable",
-                "result": {"status": "success", "armable": True},
-                "should_contain": "ready to arm"
-            }
-        ]
-        
-        for test in test_cases:
-            formatted = self.gemma.format_result_message(test["function"], test["result"])
-            
-            if test["should_contain"] in formatted:
-                print(f"[PASS] {test['function']} formatting correct: {formatted}")
-                self.passed += 1
-            else:
-                print(f"[FAIL] {test['function']} formatting incorrect: {formatted}")
-                self.failed += 1
-    
-    def run_all_tests(self):
-        """Run all tests and print summary"""
-        print("\n" + "="*60)
-        print("ARDUPILOT AI ASSISTANT - TEST SUITE")
-        print("Stage 1 Functions - Demo Mode")
-        print("="*60)
-        
-        # Run all tests
-        self.test_function_parsing()
-        self.test_arm_function()
-        self.test_disarm_function()
-        self.test_takeoff_function()
-        self.test_land_function()
-        self.test_rtl_function()
-        self.test_change_mode_function()
-        self.test_get_battery_function()
-        self.test_get_position_function()
-        self.test_result_formatting()
-        
-        # Print summary
-        print("\n" + "="*60)
-        print("TEST SUMMARY")
-        print("="*60)
-        total = self.passed + self.failed
-        percentage = (self.passed / total * 100) if total > 0 else 0
-        
-        print(f"Total Tests: {total}")
-        print(f"[PASS] Passed: {self.passed}")
-        print(f"[FAIL] Failed: {self.failed}")
-        print(f"Success Rate: {percentage:.1f}%")
-        print("="*60)
-        
-        if self.failed == 0:
-            print("\n🎉 ALL TESTS PASSED! 🎉\n")
-            return 0
-        else:
-            print(f"\n[WARN]  {self.failed} TEST(S) FAILED [WARN]\n")
-            return 1
+from src.drone_functions import DroneController, DRONE_FUNCTIONS
+
+
+@pytest.mark.parametrize(("response", "expected_name", "expected_args"), [
+    ("<start_function_call>call:arm{}<end_function_call>", "arm", {}),
+    ("<start_function_call>call:takeoff{altitude:15}<end_function_call>", "takeoff", {"altitude": 15}),
+    ("<start_function_call>call:change_mode{mode:\"GUIDED\"}<end_function_call>",
+     "change_mode", {"mode": "GUIDED"}),
+    ("<start_function_call>call:goto_location{lat:28.5,lon:77.0,alt:20}<end_function_call>",
+     "goto_location", {"lat": 28.5, "lon": 77.0, "alt": 20}),
+    ("<start_function_call>call:change_mode{mode:<escape>GUIDED, LOITER<escape>}<end_function_call>",
+     "change_mode", {"mode": "GUIDED, LOITER"}),
+])
+def test_function_parsing(gemma, response, expected_name, expected_args):
+    """Test that FunctionGemma correctly parses function calls"""
+    result = gemma.parse_function_call(response)
+
+    assert result == {"function_name": expected_name, "arguments": expected_args}
+
+
+def test_multiple_function_calls(gemma):
+    """Test that multiple calls in one response are parsed in order"""
+    calls = gemma.parse_function_calls(
+        "<start_function_call>call:arm{}<end_function_call>"
+        "<start_function_call>call:takeoff{altitude:10}<end_function_call>"
+    )
+
+    assert [c["function_name"] for c in calls] == ["arm", "takeoff"]
+
+
+@pytest.mark.parametrize(("command", "expected"), [
+    ("arm the drone", {"function_name": "arm", "arguments": {}}),
+    ("Disarm!", {"function_name": "disarm", "arguments": {}}),
+    ("return to launch", {"function_name": "rtl", "arguments": {}}),
+    ("check battery", {"function_name": "get_battery", "arguments": {}}),
+    ("where am I?", {"function_name": "get_position", "arguments": {}}),
+    ("takeoff 20", {"function_name": "takeoff", "arguments": {"altitude": 20}}),
+    ("what is the flight mode?", {"function_name": "get_mode", "arguments": {}}),
+    ("is the drone ready to arm", {"function_name": "is_armable", "arguments": {}}),
+    ("move north 10 meters", {"function_name": "move_north", "arguments": {"meters": 10}}),
+    ("fly west by 2.5m", {"function_name": "move_west", "arguments": {"meters": 2.5}}),
+    # Must fall through to the model
+    ("arm the drone and takeoff to 15 meters", None),
+    ("don't land", None),
+    ("change mode to GUIDED", None),
+    ("move north 10 feet", None),
+])
+def test_fast_path(gemma, command, expected):
+    """Test that unambiguous commands skip the model, and others don't"""
+    processed = gemma.preprocess_command(command)
+
+    assert gemma.match_fast_path(processed) == expected
+
+
+def test_arm_function(drone):
+    """Test arm function"""
+    result = drone.arm()
+
+    assert result.get("status") == "success", f"arm() failed: {result.get('message')}"
+
+
+def test_disarm_function(drone):
+    """Test disarm function"""
+    result = drone.disarm()
+
+    assert result.get("status") == "success", f"disarm() failed: {result.get('message')}"
+
+
+def test_takeoff_function(drone):
+    """Test takeoff function"""
+    # First arm the drone
+    drone.arm()
+
+    result = drone.takeoff(15)
+
+    assert result.get("status") == "success", f"takeoff(15) failed: {result.get('message')}"
+    assert result.get("altitude") == 15
+
+
+def test_takeoff_requires_arming(drone):
+    """Test that takeoff fails when not armed"""
+    drone.disarm()
+
+    result = drone.takeoff(10)
+
+    assert result.get("status") == "error"
+
+
+def test_land_function(drone):
+    """Test land function"""
+    result = drone.land()
+
+    assert result.get("status") == "success", f"land() failed: {result.get('message')}"
+
+
+def test_rtl_function(drone):
+    """Test RTL function"""
+    result = drone.rtl()
+
+    assert result.get("status") == "success", f"rtl() failed: {result.get('message')}"
+
+
+@pytest.mark.parametrize("mode", ["GUIDED", "LOITER", "RTL", "LAND"])
+def test_change_mode_function(drone, mode):
+    """Test change_mode function"""
+    result = drone.change_mode(mode)
+
+    assert result.get("status") == "success", f"change_mode('{mode}') failed"
+
+
+def test_get_battery_function(drone, gemma):
+    """Test get_battery function and its formatting"""
+    result = drone.get_battery()
+
+    assert result.get("status") == "success"
+    assert {"voltage", "current", "remaining"} <= result.keys()
+
+    formatted = gemma.format_result_message("get_battery", result)
+
+    assert "Battery:" in formatted and str(result['voltage']) in formatted, formatted
+
+
+def test_get_position_function(drone, gemma):
+    """Test get_position function and its formatting"""
+    result = drone.get_position()
+
+    assert result.get("status") == "success"
+    assert {"latitude", "longitude", "altitude"} <= result.keys()
+
+    formatted = gemma.format_result_message("get_position", result)
+
+    assert "Position:" in formatted and str(result['latitude']) in formatted, formatted
+
+
+@pytest.mark.parametrize(("function_name", "result", "should_contain"), [
+    ("arm", {"status": "success", "message": "Drone armed"}, "Drone armed"),
+    ("get_mode", {"status": "success", "mode": "GUIDED"}, "GUIDED"),
+    ("is_armable", {"status": "success", "armable": True}, "ready to arm"),
+])
+def test_result_formatting(gemma, function_name, result, should_contain):
+    """Test result message formatting for all function types"""
+    formatted = gemma.format_result_message(function_name, result)
+
+    assert should_contain in formatted
+
+
+@pytest.mark.parametrize("name", list(DRONE_FUNCTIONS))
+def test_function_definitions(name):
+    """Test that DRONE_FUNCTIONS matches the DroneController methods"""
+    func_def = DRONE_FUNCTIONS[name]
+    method = getattr(DroneController, name, None)
+    assert func_def["name"] == name and method is not None, f"no DroneController.{name}"
+
+    signature = inspect.signature(method).parameters
+    params = set(signature) - {"self"}
+    needed = {p for p in params if signature[p].default is inspect.Parameter.empty}
+    declared = set(func_def["parameters"])
+    required = {p for p, spec in func_def["parameters"].items() if spec.get("required")}
+
+    # Every declared parameter exists, and every parameter without
+    # a default is declared as required
+    assert declared <= params, f"declared {sorted(declared)}, signature {sorted(params)}"
+    assert needed <= required, f"required {sorted(required)}, signature needs {sorted(needed)}"
 
 
 if __name__ == "__main__":
-    suite = TestSuite()
-    exit_code = suite.run_all_tests()
-    sys.exit(exit_code)
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))